@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+import sys
+from optparse import OptionParser
+
+import escalation.benchmark as benchmark
+
+oparser = OptionParser(usage="%prog [options]")
+oparser.add_option("-o", "--output", action="store", dest="output", default=None, help="write the results as JSON to this file")
+oparser.add_option("-b", "--baseline", action="store", dest="baseline", default=None, help="JSON results to compare against")
+oparser.add_option("-t", "--tolerance", action="store", type="float", dest="tolerance", default=0.2, help="fraction by which a measure may be worse than the baseline (default 0.2)")
+oparser.add_option("-q", "--quick", action="store_true", dest="quick", default=False, help="smallest grid and fewer repeats only")
+(options, args) = oparser.parse_args()
+
+if options.tolerance < 0.:
+    oparser.error("Tolerance must not be negative")
+
+if options.quick:
+    results = benchmark.run_suite(grids=benchmark.GRIDS[:1], contests=10000, generations=100, repeat=1)
+else:
+    results = benchmark.run_suite()
+
+for case in results['cases']:
+    print("types {num_types} thresholds {num_thresholds} costs ({cost_obs}, {cost_win}, {cost_loss}): {contests_per_second:.0f} contests/s, {generations_per_second:.0f} generations/s, batch {batch_seconds:.3f}s".format(**case))
+
+if options.output is not None:
+    benchmark.save(results, options.output)
+
+if options.baseline is not None:
+    regressions = benchmark.compare(results, benchmark.load(options.baseline), options.tolerance)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+
+    if regressions:
+        sys.exit(1)
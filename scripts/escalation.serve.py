@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+
+from optparse import OptionParser
+
+import escalation.service as service
+import escalation.sweep as sweep
+
+oparser = OptionParser(usage="%prog [options] SOCKET", description="Jobs are sweep points: JSON objects with any of the options {0}. Other escalation.sim options are not supported.".format(", ".join(sorted(sweep.DEFAULTS))))
+oparser.add_option("-n", "--workers", action="store", type="int", dest="workers", default=None, help="number of worker processes (default one per CPU)")
+oparser.add_option("-c", "--cache-dir", action="store", dest="cache_dir", default=None, help="directory in which to cache outcome tables")
+oparser.add_option("-s", "--cache-size", action="store", type="float", dest="cache_size", default=1024., help="maximum size of the outcome table cache in megabytes (default 1024)")
+oparser.add_option("-t", "--max-tables", action="store", type="int", dest="max_tables", default=8, help="outcome tables each worker keeps in memory (default 8)")
+(options, args) = oparser.parse_args()
+
+if len(args) != 1:
+    oparser.error("A socket path is required")
+
+if options.workers is not None and options.workers < 1:
+    oparser.error("Number of workers must be at least 1")
+
+if options.max_tables < 1:
+    oparser.error("Number of tables must be at least 1")
+
+if options.cache_size <= 0.:
+    oparser.error("Cache size must be positive")
+
+service.serve(args[0], options.workers, options.cache_dir, options.max_tables, int(options.cache_size * 2 ** 20))
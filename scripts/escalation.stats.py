@@ -1,4 +1,31 @@
 #!/usr/bin/env python
 
+import json
+from optparse import OptionParser
+
+import numpy as np
+
 import escalation.stats as stats
 
+oparser = OptionParser(usage="%prog [options] DIRECTORY")
+oparser.add_option("-p", "--pattern", action="store", dest="pattern", default="trajectory_*.npy", help="glob for trajectory files (default trajectory_*.npy)")
+oparser.add_option("-n", "--workers", action="store", type="int", dest="workers", default=1, help="number of worker processes (default 1)")
+oparser.add_option("-c", "--converge-share", action="store", type="float", dest="converge_share", default=0.99, help="final share at which a run counts as converged to a type (default 0.99)")
+oparser.add_option("-m", "--mean-trajectory", action="store", dest="mean_trajectory", default=None, help="write the mean trajectory as (generation, population...) rows to this .npy file")
+(options, args) = oparser.parse_args()
+
+if len(args) != 1:
+    oparser.error("A results directory is required")
+
+if options.workers < 1:
+    oparser.error("Number of workers must be at least 1")
+
+if options.converge_share <= 0. or options.converge_share > 1.:
+    oparser.error("Converge share must be in (0, 1]")
+
+aggregate = stats.analyse(args[0], options.pattern, options.workers, options.converge_share)
+print(json.dumps(aggregate.summary(), indent=2, sort_keys=True))
+
+if options.mean_trajectory is not None:
+    nums, pops = aggregate.mean_trajectory()
+    np.save(options.mean_trajectory, np.column_stack([nums, pops]) if nums.size else np.empty((0, 0)))
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+
+import json
+import sys
+from optparse import OptionParser
+
+import escalation.service as service
+import escalation.sweep as sweep
+
+oparser = OptionParser(usage="%prog [options] SOCKET", description="Jobs are sweep points: JSON objects with any of the options {0}. Other escalation.sim options are not supported.".format(", ".join(sorted(sweep.DEFAULTS))))
+oparser.add_option("-g", "--grid", action="store", dest="grid", default=None, help="JSON file with a grid (object of option lists) or a list of option sets (default: one JSON option set per line on stdin)")
+(options, args) = oparser.parse_args()
+
+if len(args) != 1:
+    oparser.error("A socket path is required")
+
+if options.grid is not None:
+    with open(options.grid) as f:
+        option_sets = sweep.expand(json.load(f))
+else:
+    option_sets = [json.loads(line) for line in sys.stdin if line.strip()]
+
+failed = False
+for message in service.submit(args[0], option_sets):
+    print(json.dumps(message, sort_keys=True))
+    sys.stdout.flush()
+    failed = failed or 'error' in message
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+import json
+from optparse import OptionParser
+
+import escalation.sweep as sweep
+
+oparser = OptionParser(usage="%prog [options] DATABASE")
+oparser.add_option("-g", "--grid", action="store", dest="grid", default=None, help="JSON file with a grid (object of option lists) or a list of option sets to add to the sweep")
+oparser.add_option("-n", "--workers", action="store", type="int", dest="workers", default=1, help="number of worker processes (default 1)")
+oparser.add_option("-c", "--cache-dir", action="store", dest="cache_dir", default=None, help="directory in which to cache outcome tables")
+oparser.add_option("-s", "--cache-size", action="store", type="float", dest="cache_size", default=1024., help="maximum size of the outcome table cache in megabytes (default 1024)")
+oparser.add_option("-r", "--retry-failed", action="store_true", dest="retry_failed", default=False, help="requeue points that failed before")
+oparser.add_option("-d", "--dump", action="store_true", dest="dump", default=False, help="print the results as JSON lines instead of running")
+(options, args) = oparser.parse_args()
+
+if len(args) != 1:
+    oparser.error("A sweep database is required")
+
+if options.workers < 1:
+    oparser.error("Number of workers must be at least 1")
+
+if options.cache_size <= 0.:
+    oparser.error("Cache size must be positive")
+
+if options.dump:
+    store = sweep.SweepStore(args[0])
+    for point, result in store.results():
+        print(json.dumps({'options': point, 'result': result}))
+else:
+    option_sets = []
+    if options.grid is not None:
+        with open(options.grid) as f:
+            option_sets = sweep.expand(json.load(f))
+
+    counts = sweep.run_sweep(args[0], option_sets, options.workers, options.cache_dir, options.retry_failed, int(options.cache_size * 2 ** 20))
+    print(", ".join("{0} {1}".format(count, status) for status, count in sorted(counts.items())))
@@ -17,8 +17,10 @@ setup(
         "escalation"
     ],
     install_requires=[
-        'simulations>=0.5.0'
+        'simulations>=0.5.0',
+        'numpy>=1.17'
     ],
+    python_requires='>=3.5',
     package_dir={
         '': 'src',
     },
@@ -31,6 +33,10 @@ setup(
     test_suite='nose.collector',
     scripts=[
         "scripts/escalation.sim.py",
-        "scripts/escalation.stats.py"
+        "scripts/escalation.stats.py",
+        "scripts/escalation.sweep.py",
+        "scripts/escalation.bench.py",
+        "scripts/escalation.serve.py",
+        "scripts/escalation.submit.py"
     ]
 )
@@ -0,0 +1,216 @@
+import multiprocessing
+
+import numpy as np
+
+from escalation import engine, exact, typegrid
+
+
+def agent_dtype(num_types):
+    """Smallest integer dtype that holds a type index for num_types types."""
+
+    return np.min_scalar_type(max(num_types - 1, 0))
+
+
+def initial_agents(shares, size, rand):
+    """size agents in random order, with type counts drawn multinomially from shares."""
+
+    shares = np.asarray(shares, dtype=float)
+    counts = rand.multinomial(size, shares / shares.sum())
+    agents = np.repeat(np.arange(shares.shape[0]).astype(agent_dtype(shares.shape[0])), counts)
+    return agents[rand.permutation(size)]
+
+
+def agent_shares(agents, num_types):
+    return np.bincount(agents, minlength=num_types) / float(agents.shape[0])
+
+
+def _uniform_indices(rand, high, size):
+    # works the same for numpy Generators and the legacy numpy.random functions
+    return np.minimum((rand.uniform(0., 1., size) * high).astype(np.int64), high - 1)
+
+
+class TableContests(object):
+    """Contests drawn straight from an exact outcome table, one uniform number each.
+
+    Every (kind, round) cell of a pair's outcome distribution is laid end to
+    end, offset by the pair's index, so a whole batch of contests is a single
+    searchsorted over the cumulative probabilities.
+    """
+
+    def __init__(self, table, data):
+        num_types = table.shape[0]
+        limit = table.shape[-1] - 1
+        cells = table.reshape(num_types * num_types, -1)
+
+        cdf = np.cumsum(cells, axis=1)
+        cdf /= cdf[:, -1:]
+        self.num_types = num_types
+        self._cdf = (cdf + np.arange(cells.shape[0])[:, np.newaxis]).ravel()
+        self._num_cells = cells.shape[1]
+
+        kinds, rounds = np.divmod(np.arange(self._num_cells), limit + 1)
+        self._payoffs1, self._payoffs2 = engine.contest_payoffs(kinds, rounds, data)
+
+    @classmethod
+    def from_types(cls, types, data):
+        return cls(exact.outcome_table(types, data, exact.observation_limit(data['cost_obs'])), data)
+
+    def play(self, types1, types2, rand):
+        pairs = types1.astype(np.int64) * self.num_types + types2
+        index = np.searchsorted(self._cdf, pairs + rand.uniform(0., 1., pairs.shape[0]), side='right')
+        cells = np.minimum(index - pairs * self._num_cells, self._num_cells - 1)
+        return self._payoffs1[cells], self._payoffs2[cells]
+
+
+class PlayedContests(object):
+    """Contests played out round by round by engine.play_contests, for type grids too big for a table."""
+
+    def __init__(self, types, data):
+        self.types = engine.type_array(types)
+        self.num_types = self.types.shape[0]
+        self.data = data
+        (self.win_prob, self.belief_step) = typegrid.pair_arrays(self.types, data['update_modulus'])
+
+    def play(self, types1, types2, rand):
+        kind, rounds = engine.play_contests(self.types[types1], self.types[types2], self.data, rand, win_prob=self.win_prob[types1, types2], belief_step=self.belief_step[types1, types2])
+        return engine.contest_payoffs(kind, rounds, self.data)
+
+
+def match(agents, contests, rand):
+    """Pair every agent off at random for one contest each, returning their payoffs.
+
+    With an odd number of agents the one left over plays a random opponent,
+    whose own payoff is left as it was.
+    """
+
+    size = agents.shape[0]
+    order = rand.permutation(size)
+    half = size // 2
+    payoffs = np.empty(size)
+
+    payoffs1, payoffs2 = contests.play(agents[order[:half]], agents[order[half:2 * half]], rand)
+    payoffs[order[:half]] = payoffs1
+    payoffs[order[half:2 * half]] = payoffs2
+
+    if size % 2:
+        opponent = order[_uniform_indices(rand, 2 * half, 1)]
+        payoffs[order[-1:]], _ = contests.play(agents[order[-1:]], agents[opponent], rand)
+
+    return payoffs
+
+
+def moran_update(agents, payoffs, count, rand, background_rate=0., noise=None):
+    """count death-birth events at once: uniform deaths, parents in proportion to fitness."""
+
+    fitness = np.cumsum(background_rate + payoffs)
+    if fitness[-1] <= 0.:
+        return agents
+
+    dead = _uniform_indices(rand, agents.shape[0], count)
+    parents = np.searchsorted(fitness, rand.uniform(0., fitness[-1], count), side='right')
+    agents[dead] = agents[np.minimum(parents, agents.shape[0] - 1)]
+    return agents
+
+
+def imitation_update(agents, payoffs, count, rand, background_rate=0., noise=0.1):
+    """count agents each compare payoffs with a random model and copy it with Fermi probability."""
+
+    size = agents.shape[0]
+    learners = _uniform_indices(rand, size, count)
+    models = _uniform_indices(rand, size, count)
+
+    gain = (payoffs[models] - payoffs[learners]) / noise
+    copy = rand.uniform(0., 1., count) * (1. + np.exp(-np.clip(gain, -500., 500.))) < 1.
+    agents[learners[copy]] = agents[models[copy]]
+    return agents
+
+
+RULES = {
+    'moran': moran_update,
+    'imitation': imitation_update,
+}
+
+
+def evolve_agents(agents, contests, rand, rule='moran', update_share=0.01, background_rate=0., noise=0.1, stopping_rule=None, max_generations=10000):
+    """Evolve an agent population until one type is left or it runs out of generations.
+
+    A generation matches every agent once and then revises update_share of
+    them under rule. stopping_rule, if given, is reset and then checked
+    against the type shares after every generation. agents is updated in
+    place.
+
+    Returns (generations, final type shares, reason for stopping).
+    """
+
+    update = RULES[rule]
+    count = max(int(round(update_share * agents.shape[0])), 1)
+    num = 0
+    if stopping_rule is not None:
+        stopping_rule.reset()
+
+    while num < max_generations:
+        num += 1
+        payoffs = match(agents, contests, rand)
+        update(agents, payoffs, count, rand, background_rate, noise)
+
+        shares = agent_shares(agents, contests.num_types)
+        if shares.max() == 1.:
+            return num, shares, "fixation"
+
+        if stopping_rule is not None:
+            reason = stopping_rule.check(num, shares)
+            if reason is not None:
+                return num, shares, reason
+
+    return num, agent_shares(agents, contests.num_types), "max generations"
+
+
+_shard_contests = None
+
+
+def _init_shard(contests):
+    global _shard_contests
+    _shard_contests = contests
+
+
+def _evolve_shard(task):
+    agents, seed_sequence, options = task
+    rand = np.random.Generator(np.random.PCG64(seed_sequence))
+    evolve_agents(agents, _shard_contests, rand, **options)
+    return agents
+
+
+def evolve_sharded(agents, contests, seed, shards, epoch=100, workers=None, rule='moran', update_share=0.01, background_rate=0., noise=0.1, max_generations=10000):
+    """evolve_agents over a population split across processes.
+
+    Each shard evolves on its own for epoch generations; the shards are then
+    pooled, shuffled and split again, so agents migrate between shards every
+    epoch. Every shard of every epoch draws from its own sequence spawned
+    from seed (an int or a SeedSequence), so results depend on seed and
+    shards but not on workers.
+
+    Returns (generations, final type shares, reason for stopping).
+    """
+
+    seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    mixer = np.random.Generator(np.random.PCG64(seeds.spawn(1)[0]))
+    options = {'rule': rule, 'update_share': update_share, 'background_rate': background_rate, 'noise': noise}
+
+    pool = multiprocessing.Pool(workers, initializer=_init_shard, initargs=(contests,))
+    try:
+        num = 0
+        while num < max_generations:
+            generations = min(epoch, max_generations - num)
+            parts = np.array_split(agents[mixer.permutation(agents.shape[0])], shards)
+            tasks = [(part, seed_sequence, dict(options, max_generations=generations)) for part, seed_sequence in zip(parts, seeds.spawn(shards))]
+            agents = np.concatenate(pool.map(_evolve_shard, tasks, chunksize=1))
+            num += generations
+
+            shares = agent_shares(agents, contests.num_types)
+            if shares.max() == 1.:
+                return num, shares, "fixation"
+    finally:
+        pool.close()
+        pool.join()
+
+    return num, agent_shares(agents, contests.num_types), "max generations"
@@ -0,0 +1,114 @@
+import json
+import platform
+import timeit
+
+import numpy as np
+
+from escalation import engine, exact, replicator, sweep, typegrid
+
+# (num_types, num_thresholds) and (cost_obs, cost_win, cost_loss) combinations to measure
+GRIDS = [(3, 3), (5, 5), (8, 8)]
+COSTS = [(0.1, 0.2, 0.5), (0.02, 0.2, 0.5)]
+
+# the measures in a case, and whether bigger is better
+MEASURES = {
+    'contests_per_second': True,
+    'generations_per_second': True,
+    'batch_seconds': False,
+}
+
+
+def _best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        fn()
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_contests(types, data, contests, repeat=3):
+    """Contests per second played by the vectorized engine over random pairs of types."""
+
+    types = engine.type_array(types)
+    gen = np.random.RandomState(0)
+    pairs = gen.randint(types.shape[0], size=(2, contests))
+    return contests / _best_time(lambda: engine.play_contests(types[pairs[0]], types[pairs[1]], data, gen), repeat)
+
+
+def bench_generations(payoffs, generations, repeat=3):
+    """Discrete replicator generations per second over a dense payoff matrix."""
+
+    start = np.ones(payoffs.shape[0]) / payoffs.shape[0]
+
+    def run():
+        pop = start
+        for _ in range(generations):
+            pop = replicator.discrete_step(pop, payoffs, 1e-8)
+
+    return generations / _best_time(run, repeat)
+
+
+def bench_batch(options, repeat=1):
+    """Seconds for a whole batch: payoffs from scratch and every run to a stable state (or the generation cap)."""
+
+    return _best_time(lambda: sweep.Evaluator().run(options), repeat)
+
+
+def run_suite(grids=GRIDS, costs=COSTS, contests=100000, generations=1000, runs=4, repeat=3):
+    cases = []
+    for num_types, num_thresholds in grids:
+        for cost_obs, cost_win, cost_loss in costs:
+            options = dict(sweep.DEFAULTS, num_types=num_types, num_thresholds=num_thresholds, cost_obs=cost_obs, cost_win=cost_win, cost_loss=cost_loss, update_correct=0.8, runs=runs)
+            types = typegrid.make_types(num_types, num_thresholds)
+            payoffs = exact.payoff_matrix(types, options)
+
+            cases.append({
+                'num_types': num_types,
+                'num_thresholds': num_thresholds,
+                'cost_obs': cost_obs,
+                'cost_win': cost_win,
+                'cost_loss': cost_loss,
+                'contests_per_second': bench_contests(types, options, contests, repeat),
+                'generations_per_second': bench_generations(payoffs, generations, repeat),
+                'batch_seconds': bench_batch(options),
+            })
+
+    return {
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()},
+        'cases': cases,
+    }
+
+
+def _case_key(case):
+    return tuple(case[key] for key in ('num_types', 'num_thresholds', 'cost_obs', 'cost_win', 'cost_loss'))
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Descriptions of every measure that is more than tolerance worse than in baseline."""
+
+    base_cases = dict((_case_key(case), case) for case in baseline['cases'])
+    regressions = []
+
+    for case in results['cases']:
+        base = base_cases.get(_case_key(case))
+        if base is None:
+            continue
+
+        for measure, higher_is_better in sorted(MEASURES.items()):
+            ratio = case[measure] / base[measure] if higher_is_better else base[measure] / case[measure]
+            if ratio < 1. - tolerance:
+                regressions.append("{0} for {1}: {2:.4g} against baseline {3:.4g}".format(measure, _case_key(case), case[measure], base[measure]))
+
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from escalation import engine
+
+# data entries that determine the payoffs, besides the types themselves
+KEY_FIELDS = ('cost_obs', 'cost_win', 'cost_loss', 'update_modulus', 'update_correct')
+
+# data entries that determine a cost-independent outcome table
+TABLE_KEY_FIELDS = ('update_modulus', 'update_correct', 'table_limit')
+
+
+def cache_key(data, fields=KEY_FIELDS):
+    """Content hash of the types and the parameters in fields."""
+
+    digest = hashlib.sha1()
+    digest.update(json.dumps([repr(float(data[field])) for field in fields]).encode('ascii'))
+    digest.update(np.ascontiguousarray(engine.type_array(data['types'])).tobytes())
+    return digest.hexdigest()
+
+
+class PayoffCache(object):
+    """Directory of .npy arrays keyed by content hash, with LRU eviction.
+
+    Arrays are loaded memory-mapped and read-only, so processes using the same
+    entry share one copy through the page cache. Entries are written to a
+    temporary file and renamed into place, so concurrent writers of the same
+    key are harmless. Recency is the file modification time, refreshed on
+    every load.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+
+    def path(self, key, name):
+        return os.path.join(self.directory, "{0}.{1}.npy".format(key, name))
+
+    def load(self, key, name):
+        path = self.path(key, name)
+        try:
+            res = np.load(path, mmap_mode='r')
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+
+        return res
+
+    def store(self, key, name, array):
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.save(f, np.asarray(array))
+            os.rename(tmp_path, self.path(key, name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict(keep=self.path(key, name))
+
+    def fetch(self, key, name, compute):
+        res = self.load(key, name)
+        if res is None:
+            computed = np.asarray(compute())
+            self.store(key, name, computed)
+            res = self.load(key, name)
+            # another process sharing the directory may already have evicted it
+            if res is None:
+                res = computed
+
+        return res
+
+    def evict(self, keep=None):
+        if self.max_bytes is None:
+            return
+
+        entries = []
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith('.npy') or path == keep:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(keep):
+            total += os.path.getsize(keep)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+def checkpoint_path(directory, member, run=0):
+    """Path for a run's checkpoint; only batch members have a member number to keep theirs apart."""
+
+    if member is None:
+        raise ValueError("checkpoints need a batch member number")
+
+    return os.path.join(directory, "checkpoint_{0}_{1}.npz".format(member, run))
+
+
+def rng_state(rand):
+    """JSON text for the state of a numpy Generator, RandomState or the numpy.random module."""
+
+    # the numpy.random module has a bit_generator too, but keeps its state in get_state
+    if isinstance(rand, np.random.Generator):
+        return json.dumps({'bit_generator': rand.bit_generator.state})
+
+    (name, keys, pos, has_gauss, cached_gaussian) = rand.get_state()
+    return json.dumps({'legacy': [name, keys.tolist(), pos, has_gauss, cached_gaussian]})
+
+
+def set_rng_state(rand, text):
+    state = json.loads(text)
+    if 'bit_generator' in state:
+        rand.bit_generator.state = state['bit_generator']
+    else:
+        (name, keys, pos, has_gauss, cached_gaussian) = state['legacy']
+        rand.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+
+
+def save(path, **arrays):
+    """Write arrays to path as an .npz, atomically replacing any earlier checkpoint."""
+
+    directory = os.path.dirname(path) or '.'
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            np.savez(f, **arrays)
+        os.rename(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load(path):
+    """The arrays saved at path, or None if there is no checkpoint there."""
+
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as f:
+        return dict((key, f[key]) for key in f.files)
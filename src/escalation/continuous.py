@@ -0,0 +1,118 @@
+import numpy as np
+
+# Dormand-Prince 5(4) tableau; the last row of A is also the fifth-order weights
+_C = np.array([0., 1. / 5., 3. / 10., 4. / 5., 8. / 9., 1., 1.])
+_A = [
+    [],
+    [1. / 5.],
+    [3. / 40., 9. / 40.],
+    [44. / 45., -56. / 15., 32. / 9.],
+    [19372. / 6561., -25360. / 2187., 64448. / 6561., -212. / 729.],
+    [9017. / 3168., -355. / 33., 46732. / 5247., 49. / 176., -5103. / 18656.],
+    [35. / 384., 0., 500. / 1113., 125. / 192., -2187. / 6784., 11. / 84.],
+]
+_B = np.array(_A[6] + [0.])
+_B_LOW = np.array([5179. / 57600., 0., 7571. / 16695., 393. / 640., -92097. / 339200., 187. / 2100., 1. / 40.])
+
+_EXTINCT = 1e-200
+
+
+def vector_field(pop, payoffs):
+    """Continuous-time replicator dynamics: dx_i/dt = x_i (u(e^i, x) - u(x, x)).
+
+    The mean payoff is taken over pop normalised, which changes nothing on
+    the simplex but makes sum(x) an invariant everywhere. Runge-Kutta steps
+    preserve linear invariants, so stage points don't drift off the simplex
+    (and away from it when the mean payoff is negative).
+    """
+
+    fitness = np.asarray(payoffs.dot(pop))
+    return pop * (fitness - np.dot(pop, fitness) / pop.sum())
+
+
+def _on_simplex(pop):
+    # shares decaying towards zero would otherwise go subnormal, which makes every step far slower
+    pop = np.where(pop > _EXTINCT, pop, 0.)
+    return pop / pop.sum()
+
+
+def _hermite(theta, h, y0, f0, y1, f1):
+    # cubic Hermite interpolant between two accepted steps, from values and slopes at both ends
+    theta2 = theta * theta
+    theta3 = theta2 * theta
+    return ((2. * theta3 - 3. * theta2 + 1.) * y0 + (theta3 - 2. * theta2 + theta) * h * f0
+            + (3. * theta2 - 2. * theta3) * y1 + (theta3 - theta2) * h * f1)
+
+
+def integrate(pop, payoffs, t_end, times=(), rtol=1e-6, atol=1e-9, speed_tol=None, first_step=None, max_steps=100000):
+    """Integrate the continuous-time replicator dynamics from pop with adaptive Dormand-Prince steps.
+
+    Steps are accepted when the embedded fourth-order error estimate is
+    within atol + rtol |x| (RMS over types), and resized from it. Accepted
+    states are projected back onto the simplex. The population at each of
+    times (within [0, t_end]) is read off a cubic Hermite interpolant of
+    the step it falls in, so asking for more output doesn't shorten the
+    steps. Integration stops early once the l1 norm of dx/dt falls below
+    speed_tol; near a rest point the steps are limited by stability rather
+    than accuracy, and the speed only settles to around the tolerances, so
+    speed_tol needs to be somewhat above them.
+
+    Returns (accepted steps, time reached, population, reason for stopping,
+    array of the populations at times).
+    """
+
+    pop = _on_simplex(np.asarray(pop, dtype=float))
+    times = np.sort(np.asarray(times, dtype=float))
+    samples = np.empty((times.shape[0], pop.shape[0]))
+    sampled = 0
+
+    t = 0.
+    slope = vector_field(pop, payoffs)
+    h = first_step
+    if h is None:
+        scale = atol + rtol * np.abs(pop)
+        h = 0.01 * np.sqrt(np.mean(pop ** 2 / scale ** 2)) / max(np.sqrt(np.mean(slope ** 2 / scale ** 2)), 1e-10)
+        h = min(max(h, 1e-6), t_end)
+
+    while sampled < times.shape[0] and times[sampled] <= t:
+        samples[sampled] = pop
+        sampled += 1
+
+    steps = 0
+    reason = "time"
+    while t < t_end:
+        if speed_tol is not None and np.abs(slope).sum() < speed_tol:
+            reason = "stationary"
+            break
+        if steps >= max_steps:
+            reason = "max steps"
+            break
+
+        h = min(h, t_end - t)
+        stages = np.empty((7, pop.shape[0]))
+        stages[0] = slope
+        for k in range(1, 7):
+            stages[k] = vector_field(pop + h * np.dot(_A[k], stages[:k]), payoffs)
+
+        new_pop = pop + h * np.dot(_B, stages)
+        error = h * np.dot(_B - _B_LOW, stages)
+        scale = atol + rtol * np.maximum(np.abs(pop), np.abs(new_pop))
+        # BLAS nrm2 scales as it goes, so squaring tiny errors doesn't go subnormal either
+        norm = np.linalg.norm(error / scale) / np.sqrt(pop.shape[0])
+
+        if norm <= 1.:
+            new_pop = _on_simplex(new_pop)
+            # FSAL: the last stage is the slope at the new point, up to the projection
+            new_slope = np.where(new_pop > 0., stages[6], 0.)
+
+            while sampled < times.shape[0] and times[sampled] <= t + h:
+                theta = (times[sampled] - t) / h
+                samples[sampled] = _on_simplex(_hermite(theta, h, pop, slope, new_pop, new_slope))
+                sampled += 1
+
+            (t, pop, slope) = (t + h, new_pop, new_slope)
+            steps += 1
+
+        h *= min(max(0.9 * (norm if norm > 0. else 1e-10) ** -0.2, 0.2), 10.)
+
+    return steps, t, pop, reason, samples[:sampled]
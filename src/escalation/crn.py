@@ -0,0 +1,47 @@
+import numpy as np
+
+# uniform numbers drawn per contest round: fight decision, fight winner, belief update
+SLOTS = 3
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(x):
+    # splitmix64 finaliser, elementwise on uint64 arrays (wrapping arithmetic)
+    z = x + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+def contest_ids(pairs, indices):
+    """Counter for the indices-th contest of each pair, pairs being flat i * num_types + j indices."""
+
+    return (np.asarray(pairs, dtype=np.uint64) << np.uint64(32)) | np.asarray(indices, dtype=np.uint64)
+
+
+class CommonRandomNumbers(object):
+    """Counter-based uniform numbers for common-random-numbers comparisons.
+
+    The number for (contest, round, slot) is a hash of those counters and the
+    seed, so it is the same whatever else is drawn, in whatever order. Runs
+    that differ only in costs or update parameters then see exactly the same
+    randomness for the same contest of the same pair of types, and their
+    differences are free of sampling noise between them.
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        with np.errstate(over='ignore'):
+            self._key = _mix(np.array([seed], dtype=np.uint64))[0]
+
+    def contest_draws(self, ids, rnd):
+        """(SLOTS, len(ids)) uniform numbers in [0, 1) for round rnd of the contests ids."""
+
+        ids = np.asarray(ids, dtype=np.uint64)
+        counters = (np.uint64(rnd) * np.uint64(SLOTS) + np.arange(SLOTS, dtype=np.uint64))[:, np.newaxis]
+        with np.errstate(over='ignore'):
+            bits = _mix(_mix(self._key ^ ids)[np.newaxis, :] ^ counters)
+        return (bits >> np.uint64(11)).astype(np.float64) * 2. ** -53
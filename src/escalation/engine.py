@@ -0,0 +1,286 @@
+import numpy as np
+import numpy.lib.recfunctions
+import numpy.random as rand
+
+from escalation import crn, typegrid
+
+# outcome kinds, named from player one's point of view
+BOTH_RUN, ONE_RUNS, TWO_RUNS, ONE_WINS, TWO_WINS, LIMIT = range(6)
+NUM_KINDS = 6
+
+# each kind as seen from player two's side: swapping the players swaps who ran or won
+MIRROR = np.array([BOTH_RUN, TWO_RUNS, ONE_RUNS, TWO_WINS, ONE_WINS, LIMIT])
+
+# payoff before observation costs and the fight cost subtracted, per kind
+_BASE = np.array([(0.5, 0.5), (0.5, 1.), (1., 0.5), (1., 0.5), (0.5, 1.), (0., 0.)])
+
+
+# beliefs closer than this to a threshold count as on it, whatever rounding error computing them left
+BELIEF_TOL = 1e-9
+
+
+def below(belief, threshold):
+    """Whether belief is below threshold, up to BELIEF_TOL.
+
+    Beliefs that should land exactly on a threshold, as they do on grids
+    with non-dyadic spacing, come out on either side of it in floating
+    point depending on how they were computed. Every contest path decides
+    running (below the run threshold) and fighting (not below the fight
+    threshold) through here, so they all resolve such ties the same way.
+    """
+
+    return belief < threshold - BELIEF_TOL
+
+
+def type_array(types):
+    """types as an (N, 3) float array, from a structured type grid or a sequence of triples."""
+
+    types = np.asarray(types)
+    if types.dtype.names is not None:
+        return np.lib.recfunctions.structured_to_unstructured(types, dtype=float).reshape(-1, 3)
+
+    return np.asarray(types, dtype=float).reshape(-1, 3)
+
+
+def upper_pairs(num_types):
+    """Flat indices i * num_types + j of the pairs with i <= j.
+
+    Contests are symmetric under swapping the players, so these pairs, played
+    once each, give every entry of a pair-indexed array.
+    """
+
+    rows, cols = np.triu_indices(num_types)
+    return rows * num_types + cols
+
+
+def observation_costs(cost_obs):
+    """Accumulated observation cost at the start of each round.
+
+    The last entry is the first one to reach 1, which is the round at which
+    the contest is called off. Costs are accumulated by repeated addition,
+    as a contest pays for its observations one round at a time.
+    """
+
+    if cost_obs <= 0.:
+        raise ValueError("cost_obs must be positive for contests to terminate")
+
+    costs = [0.]
+    while costs[-1] < 1.:
+        costs.append(costs[-1] + cost_obs)
+
+    return np.array(costs)
+
+
+def outcome_payoffs(kind, obs_costs, cost_win, cost_loss):
+    """Payoffs to (player one, player two) for contests ending in kind after obs_costs were paid."""
+
+    kind = np.asarray(kind)
+    extra = np.zeros(kind.shape + (2,))
+    extra[kind == ONE_WINS] = (cost_win, cost_loss)
+    extra[kind == TWO_WINS] = (cost_loss, cost_win)
+    obs_costs = np.asarray(obs_costs)[..., np.newaxis]
+
+    res = np.maximum(_BASE[kind] - obs_costs - extra, 0.)
+    return res[..., 0], res[..., 1]
+
+
+def play_contests(strategy1, strategy2, data, rand=rand, ids=None, win_prob=None, belief_step=None):
+    """Play one contest per row of strategy1 against the same row of strategy2.
+
+    All live contests advance one observation round at a time, with every
+    random number for the round drawn in a single block. Beliefs are kept as
+    the net number of correct updates, so p1 is 0.5 + net * step.
+    win_prob and belief_step, when given, are each contest's entries of
+    typegrid.pair_arrays, which callers playing many contests of the same
+    pairs compute once.
+
+    rand may be a crn.CommonRandomNumbers, in which case each contest's
+    numbers are those of its counter in ids (see crn.contest_ids).
+
+    Returns (kind, rounds) arrays, with rounds the number of observation
+    rounds paid for before the contest ended.
+    """
+
+    strategy1 = type_array(strategy1)
+    strategy2 = type_array(strategy2)
+    num = strategy1.shape[0]
+
+    costs = observation_costs(data['cost_obs'])
+    update_correct = data['update_correct']
+    step = belief_step if belief_step is not None else (strategy1[:, 0] - strategy2[:, 0]) / (2. * data['update_modulus'])
+    if win_prob is None:
+        win_prob = strategy1[:, 0] / (strategy1[:, 0] + strategy2[:, 0])
+
+    kind = np.empty(num, dtype=np.int8)
+    kind.fill(LIMIT)
+    rounds = np.empty(num, dtype=np.int64)
+    rounds.fill(len(costs) - 1)
+
+    live = np.arange(num)
+    net = np.zeros(num)
+
+    for rnd in range(len(costs) - 1):
+        if not live.size:
+            break
+
+        p1 = 0.5 + net * step[live]
+        p2 = 0.5 - net * step[live]
+        if ids is not None and hasattr(rand, 'contest_draws'):
+            draws = rand.contest_draws(ids[live], rnd)
+        else:
+            draws = rand.uniform(0., 1., size=(3, live.size))
+
+        run1 = below(p1, strategy1[live, 1])
+        run2 = below(p2, strategy2[live, 1])
+        fight1 = ~below(p1, strategy1[live, 2])
+        fight2 = ~below(p2, strategy2[live, 2])
+
+        res = np.empty(live.size, dtype=np.int8)
+        res.fill(-1)
+        res[run1 & run2] = BOTH_RUN
+        res[run1 & ~run2] = ONE_RUNS
+        res[run2 & ~run1] = TWO_RUNS
+
+        undecided = ~(run1 | run2)
+        one_only = undecided & fight1 & ~fight2
+        two_only = undecided & fight2 & ~fight1
+        fight = (undecided & fight1 & fight2) | (one_only & (draws[0] <= p2)) | (two_only & (draws[0] <= p1))
+        res[one_only & ~fight] = TWO_RUNS
+        res[two_only & ~fight] = ONE_RUNS
+
+        one_wins = draws[1] <= win_prob[live]
+        res[fight & one_wins] = ONE_WINS
+        res[fight & ~one_wins] = TWO_WINS
+
+        done = res >= 0
+        kind[live[done]] = res[done]
+        rounds[live[done]] = rnd
+
+        going = ~done
+        live = live[going]
+        net = net[going] + np.where(draws[2][going] < update_correct, 1., -1.)
+
+    return kind, rounds
+
+
+def contest_payoffs(kind, rounds, data):
+    costs = observation_costs(data['cost_obs'])
+    return outcome_payoffs(kind, costs[rounds], data['cost_win'], data['cost_loss'])
+
+
+def sample_payoffs(types, data, samples, rand=rand, block_size=2 ** 18, telemetry=None):
+    """Monte Carlo estimate of the payoff matrix.
+
+    Entry (i, j) is the mean payoff to type i playing type j, from samples
+    contests per pair. Only pairs with i <= j are played: their contests
+    give entry (i, j) from player one's payoffs and entry (j, i) from player
+    two's. Pairs are played block_size contests at a time, and their
+    outcomes counted into telemetry, from both sides, when one is given.
+    With a crn.CommonRandomNumbers for rand, the k-th contest of each pair
+    always sees the same numbers.
+    """
+
+    types = type_array(types)
+    num_types = types.shape[0]
+    (win_prob, belief_step) = [pairs.ravel() for pairs in typegrid.pair_arrays(types, data['update_modulus'])]
+    total = np.zeros((2, num_types * num_types))
+
+    upper = upper_pairs(num_types)
+    pairs_per_block = max(block_size // samples, 1)
+    for start in range(0, upper.size, pairs_per_block):
+        pairs = upper[start:start + pairs_per_block]
+        contests = np.repeat(pairs, samples)
+        ids = crn.contest_ids(contests, np.tile(np.arange(samples), pairs.size))
+        kind, rounds = play_contests(types[contests // num_types], types[contests % num_types], data, rand, ids, win_prob[contests], belief_step[contests])
+        if telemetry is not None:
+            _count_both_sides(telemetry, contests // num_types, contests % num_types, kind, rounds)
+        payoff1, payoff2 = contest_payoffs(kind, rounds, data)
+        total[0, pairs] = payoff1.reshape(-1, samples).sum(axis=1)
+        total[1, pairs] = payoff2.reshape(-1, samples).sum(axis=1)
+
+    return _from_upper(total[0], total[1], num_types) / samples
+
+
+def _count_both_sides(telemetry, types1, types2, kind, rounds):
+    # a contest of i against j is also one of j against i, with the kind mirrored
+    telemetry.count_many(types1, types2, kind, rounds)
+    swapped = types1 != types2
+    telemetry.count_many(types2[swapped], types1[swapped], MIRROR[kind[swapped]], rounds[swapped])
+
+
+def _from_upper(upper_values, mirrored_values, num_types):
+    # entries for pairs i <= j from upper_values, and (j, i) from mirrored_values at (i, j)
+    res = np.asarray(mirrored_values).reshape(num_types, num_types).T.copy()
+    rows, cols = np.triu_indices(num_types)
+    res[rows, cols] = np.asarray(upper_values).reshape(num_types, num_types)[rows, cols]
+    return res
+
+
+def _merge_moments(count, mean, m2, pairs, extra, payoffs):
+    # fold a batch of extra[k] payoffs for each of pairs into each row's running moments (Chan et al.)
+    index = np.repeat(np.arange(pairs.size), extra)
+    total = count[pairs] + extra
+
+    for row in range(payoffs.shape[0]):
+        batch_mean = np.bincount(index, payoffs[row], pairs.size) / extra
+        batch_m2 = np.bincount(index, (payoffs[row] - batch_mean[index]) ** 2, pairs.size)
+
+        delta = batch_mean - mean[row, pairs]
+        mean[row, pairs] += delta * extra / total
+        m2[row, pairs] += batch_m2 + delta ** 2 * count[pairs] * extra / total
+
+    count[pairs] = total
+
+
+def adaptive_payoffs(types, data, samples, target_se, max_samples, rand=rand, block_size=2 ** 18, telemetry=None):
+    """Monte Carlo estimate of the payoff matrix, sampling each pair only as much as it needs.
+
+    Every pair is first played samples times. After that, pairs whose
+    standard error is still above target_se get as many more contests as
+    their sample variance says they need, at least samples and never past
+    max_samples in total, until every pair is within target_se or capped.
+    Pairs whose outcome never varies stop after the first batch. As in
+    sample_payoffs, only pairs with i <= j are played, and a pair is done
+    once the payoffs to both sides are.
+
+    Returns (means, stderr, counts) matrices.
+    """
+
+    types = type_array(types)
+    num_types = types.shape[0]
+    (win_prob, belief_step) = [pairs.ravel() for pairs in typegrid.pair_arrays(types, data['update_modulus'])]
+    count = np.zeros(num_types * num_types, dtype=np.int64)
+    mean = np.zeros((2, num_types * num_types))
+    m2 = np.zeros((2, num_types * num_types))
+
+    pending = upper_pairs(num_types)
+    extra = np.minimum(samples, max_samples) * np.ones(pending.size, dtype=np.int64)
+    while pending.size:
+        ends = np.cumsum(extra)
+        start = 0
+        while start < pending.size:
+            stop = max(np.searchsorted(ends, ends[start] - extra[start] + block_size, side='right'), start + 1)
+            pairs = pending[start:stop]
+            contests = np.repeat(pairs, extra[start:stop])
+            firsts = np.repeat(count[pairs] - np.cumsum(extra[start:stop]) + extra[start:stop], extra[start:stop])
+            ids = crn.contest_ids(contests, firsts + np.arange(contests.size))
+            kind, rounds = play_contests(types[contests // num_types], types[contests % num_types], data, rand, ids, win_prob[contests], belief_step[contests])
+            if telemetry is not None:
+                _count_both_sides(telemetry, contests // num_types, contests % num_types, kind, rounds)
+            _merge_moments(count, mean, m2, pairs, extra[start:stop], np.vstack(contest_payoffs(kind, rounds, data)))
+            start = stop
+
+        variance = m2[:, pending].max(axis=0) / np.maximum(count[pending] - 1, 1)
+        unsure = (variance > target_se ** 2 * count[pending]) & (count[pending] < max_samples)
+        pending = pending[unsure]
+        needed = np.ceil(variance[unsure] / target_se ** 2).astype(np.int64) - count[pending]
+        extra = np.minimum(np.maximum(needed, samples), max_samples - count[pending])
+
+    stderr = np.sqrt(m2 / np.maximum(count - 1, 1) / np.maximum(count, 1))
+    return _from_upper(mean[0], mean[1], num_types), _from_upper(stderr[0], stderr[1], num_types), _from_upper(count, count, num_types)
+
+
+def confidence_bounds(means, stderr, z=1.96):
+    """Normal-approximation confidence interval (low, high) on each estimated payoff; z=1.96 gives 95%."""
+
+    return means - z * stderr, means + z * stderr
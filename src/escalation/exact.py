@@ -0,0 +1,225 @@
+import numpy as np
+
+from escalation import engine
+
+
+def observation_limit(cost_obs):
+    """Round at which contests are called off for observation cost cost_obs."""
+
+    return len(engine.observation_costs(cost_obs)) - 1
+
+
+def _walk(strategy1, strategy2, data, limit=None):
+    """Propagate the belief random walk of each contest round by round.
+
+    The state of a contest is the net number of correct updates, which lies
+    in [-R, R] for a contest called off at round R. Yields (round, stopped)
+    where stopped[c, kind] is the probability that contest c ends in kind at
+    that round; the last round yields whatever mass hit the observation limit.
+
+    Only the strengths, thresholds and update parameters matter to the walk;
+    the costs only set the limit, which can be given explicitly instead.
+    """
+
+    strategy1 = engine.type_array(strategy1)
+    strategy2 = engine.type_array(strategy2)
+    num = strategy1.shape[0]
+
+    if limit is None:
+        limit = observation_limit(data['cost_obs'])
+    update_correct = data['update_correct']
+    step = (strategy1[:, 0] - strategy2[:, 0]) / (2. * data['update_modulus'])
+    win_prob = (strategy1[:, 0] / (strategy1[:, 0] + strategy2[:, 0]))[:, np.newaxis]
+
+    net = np.arange(-limit, limit + 1, dtype=float)
+    p1 = 0.5 + step[:, np.newaxis] * net
+    p2 = 0.5 - step[:, np.newaxis] * net
+
+    run1 = engine.below(p1, strategy1[:, 1:2])
+    run2 = engine.below(p2, strategy2[:, 1:2])
+    fight1 = ~engine.below(p1, strategy1[:, 2:3])
+    fight2 = ~engine.below(p2, strategy2[:, 2:3])
+    undecided = ~(run1 | run2)
+    one_only = undecided & fight1 & ~fight2
+    two_only = undecided & fight2 & ~fight1
+
+    # per-state probability of each way the round can end
+    fight = (undecided & fight1 & fight2) + one_only * np.clip(p2, 0., 1.) + two_only * np.clip(p1, 0., 1.)
+    ends = np.zeros((engine.NUM_KINDS,) + p1.shape)
+    ends[engine.BOTH_RUN] = run1 & run2
+    ends[engine.ONE_RUNS] = (run1 & ~run2) + two_only * (1. - np.clip(p1, 0., 1.))
+    ends[engine.TWO_RUNS] = (run2 & ~run1) + one_only * (1. - np.clip(p2, 0., 1.))
+    ends[engine.ONE_WINS] = fight * win_prob
+    ends[engine.TWO_WINS] = fight * (1. - win_prob)
+    going = undecided & ~fight1 & ~fight2
+
+    mass = np.zeros(p1.shape)
+    mass[:, limit] = 1.
+
+    for rnd in range(limit):
+        yield rnd, (ends * mass).sum(axis=2).T
+
+        mass = mass * going
+        moved = np.zeros(mass.shape)
+        moved[:, 1:] += update_correct * mass[:, :-1]
+        moved[:, :-1] += (1. - update_correct) * mass[:, 1:]
+        mass = moved
+
+    stopped = np.zeros((num, engine.NUM_KINDS))
+    stopped[:, engine.LIMIT] = mass.sum(axis=1)
+    yield limit, stopped
+
+
+def outcome_distribution(strategy1, strategy2, data, limit=None):
+    """Probability of each (kind, round) ending, as an array of shape (contests, NUM_KINDS, limit + 1)."""
+
+    return np.dstack([stopped for _, stopped in _walk(strategy1, strategy2, data, limit)])
+
+
+def expected_payoffs(strategy1, strategy2, data):
+    """Exact expected payoffs to (player one, player two) for each row of strategy1 against strategy2."""
+
+    costs = engine.observation_costs(data['cost_obs'])
+    kinds = np.arange(engine.NUM_KINDS)
+    payoff1 = 0.
+    payoff2 = 0.
+
+    for rnd, stopped in _walk(strategy1, strategy2, data):
+        kind_payoff1, kind_payoff2 = engine.outcome_payoffs(kinds, costs[rnd], data['cost_win'], data['cost_loss'])
+        payoff1 = payoff1 + np.dot(stopped, kind_payoff1)
+        payoff2 = payoff2 + np.dot(stopped, kind_payoff2)
+
+    return payoff1, payoff2
+
+
+def payoff_blocks(row_types, col_types, data, block_size=2 ** 12):
+    """Exact payoffs to each of row_types playing each of col_types, and to each of col_types playing each of row_types.
+
+    Both come from the same contests, with the players' sides swapped.
+    """
+
+    row_types = engine.type_array(row_types)
+    col_types = engine.type_array(col_types)
+    num_rows = row_types.shape[0]
+    num_cols = col_types.shape[0]
+    res = np.empty((2, num_rows * num_cols))
+
+    for start in range(0, num_rows * num_cols, block_size):
+        pairs = np.arange(start, min(start + block_size, num_rows * num_cols))
+        res[0, pairs], res[1, pairs] = expected_payoffs(row_types[pairs // num_cols], col_types[pairs % num_cols], data)
+
+    return res[0].reshape(num_rows, num_cols), res[1].reshape(num_rows, num_cols).T.copy()
+
+
+def payoff_block(row_types, col_types, data, block_size=2 ** 12):
+    """Exact payoffs to each of row_types playing each of col_types."""
+
+    return payoff_blocks(row_types, col_types, data, block_size)[0]
+
+
+def payoff_matrix(types, data, block_size=2 ** 12):
+    """Exact payoff matrix: entry (i, j) is the expected payoff to type i playing type j.
+
+    Only pairs with i <= j are walked; entry (j, i) is player two's payoff in
+    the walk for (i, j).
+    """
+
+    types = engine.type_array(types)
+    num_types = types.shape[0]
+    upper = engine.upper_pairs(num_types)
+    res = np.zeros((2, num_types * num_types))
+
+    for start in range(0, upper.size, block_size):
+        pairs = upper[start:start + block_size]
+        res[0, pairs], res[1, pairs] = expected_payoffs(types[pairs // num_types], types[pairs % num_types], data)
+
+    return engine._from_upper(res[0], res[1], num_types)
+
+
+def outcome_matrix(types, data, block_size=2 ** 12):
+    """Probability of each outcome kind, as an array of shape (types, types, NUM_KINDS)."""
+
+    types = engine.type_array(types)
+    num_types = types.shape[0]
+    res = np.empty((num_types * num_types, engine.NUM_KINDS))
+
+    for start in range(0, num_types * num_types, block_size):
+        pairs = np.arange(start, min(start + block_size, num_types * num_types))
+        res[pairs] = outcome_distribution(types[pairs // num_types], types[pairs % num_types], data).sum(axis=2)
+
+    return res.reshape(num_types, num_types, engine.NUM_KINDS)
+
+
+def packed_outcome_table(types, data, limit, block_size=2 ** 12):
+    """outcome_table for only the pairs i <= j, in engine.upper_pairs order.
+
+    Half the size of the full table, which unpack_outcome_table rebuilds from
+    it; this is the form outcome tables are cached in.
+    """
+
+    types = engine.type_array(types)
+    num_types = types.shape[0]
+    upper = engine.upper_pairs(num_types)
+    res = np.empty((upper.size, engine.NUM_KINDS, limit + 1))
+
+    for start in range(0, upper.size, block_size):
+        pairs = upper[start:start + block_size]
+        res[start:start + pairs.size] = outcome_distribution(types[pairs // num_types], types[pairs % num_types], data, limit)
+
+    return res
+
+
+def unpack_outcome_table(packed, num_types):
+    """The full outcome_table from a packed one, mirroring each pair's kinds for the swapped pair."""
+
+    rows, cols = np.triu_indices(num_types)
+    res = np.empty((num_types, num_types) + packed.shape[1:])
+    res[cols, rows] = packed[:, engine.MIRROR]
+    res[rows, cols] = packed
+    return res
+
+
+def outcome_table(types, data, limit, block_size=2 ** 12):
+    """Cost-independent outcome distribution for every pair of types.
+
+    Entry (i, j, kind, round) is the probability that type i playing type j
+    ends in kind after round observation rounds, for contests called off at
+    round limit. Only data['update_modulus'] and data['update_correct'] are
+    used, so the table serves every cost vector whose observation limit is
+    at most limit (see payoffs_from_outcomes).
+    """
+
+    types = engine.type_array(types)
+    return unpack_outcome_table(packed_outcome_table(types, data, limit, block_size), types.shape[0])
+
+
+def _cut(table, cost_obs):
+    limit = observation_limit(cost_obs)
+    if limit > table.shape[-1] - 1:
+        raise ValueError("outcome table only covers {0} rounds, cost_obs {1!r} needs {2}".format(table.shape[-1] - 1, cost_obs, limit))
+
+    return limit
+
+
+def payoffs_from_outcomes(table, cost_obs, cost_win, cost_loss):
+    """Payoff matrix for one cost vector, as a linear map of an outcome_table.
+
+    Contests still going at the observation limit for cost_obs are called off
+    there with nothing for either side, so only earlier rounds contribute.
+    """
+
+    limit = _cut(table, cost_obs)
+    costs = engine.observation_costs(cost_obs)[:limit]
+    kinds = np.arange(engine.NUM_KINDS)[:, np.newaxis]
+    weights, _ = engine.outcome_payoffs(kinds, costs[np.newaxis, :], cost_win, cost_loss)
+
+    return np.tensordot(table[..., :limit], weights, axes=([-2, -1], [0, 1]))
+
+
+def outcomes_from_table(table, cost_obs):
+    """Probability of each outcome kind for one observation cost, as outcome_matrix."""
+
+    limit = _cut(table, cost_obs)
+    res = table[..., :limit].sum(axis=-1)
+    res[..., engine.LIMIT] += table[..., limit:].sum(axis=(-2, -1))
+    return res
@@ -0,0 +1,72 @@
+import numpy as np
+
+from escalation import engine, exact
+
+
+class TiledFitness(object):
+    """Payoff matrix-vector products without materialising the payoff matrix.
+
+    The matrix is split into tile_size x tile_size tiles, each computed exactly
+    when it is needed. Tiles are kept (as dtype) while they fit within
+    memory_budget bytes and recomputed on every product otherwise, so memory
+    use is bounded by the budget plus one tile regardless of the number of
+    types. Tiles (r, c) and (c, r) come from the same contests with the
+    players swapped, so they are computed together. Quacks enough like the
+    dense matrix for the replicator code: it has a shape, dot and submatrix.
+    """
+
+    def __init__(self, types, data, tile_size=1024, dtype=np.float64, memory_budget=0):
+        self.types = engine.type_array(types)
+        self.data = data
+        self.tile_size = tile_size
+        self.dtype = np.dtype(dtype)
+        self.memory_budget = memory_budget
+        self.shape = (self.types.shape[0], self.types.shape[0])
+        self._tiles = {}
+        self._kept_bytes = 0
+
+    def _bounds(self):
+        return [(start, min(start + self.tile_size, self.shape[0])) for start in range(0, self.shape[0], self.tile_size)]
+
+    def _keep(self, key, tile):
+        if self._kept_bytes + tile.nbytes <= self.memory_budget:
+            self._tiles[key] = tile
+            self._kept_bytes += tile.nbytes
+
+    def tiles(self, rows, cols):
+        """Tiles (rows, cols) and (cols, rows), from one computation unless both are kept."""
+
+        if (rows, cols) in self._tiles and (cols, rows) in self._tiles:
+            return self._tiles[(rows, cols)], self._tiles[(cols, rows)]
+
+        if rows == cols:
+            res = exact.payoff_matrix(self.types[rows[0]:rows[1]], self.data).astype(self.dtype)
+            self._keep((rows, cols), res)
+            return res, res
+
+        (res, mirrored) = exact.payoff_blocks(self.types[rows[0]:rows[1]], self.types[cols[0]:cols[1]], self.data)
+        (res, mirrored) = (res.astype(self.dtype), mirrored.astype(self.dtype))
+        self._keep((rows, cols), res)
+        self._keep((cols, rows), mirrored)
+        return res, mirrored
+
+    def tile(self, rows, cols):
+        return self.tiles(rows, cols)[0]
+
+    def dot(self, pop):
+        pop = np.asarray(pop)
+        cast = pop.astype(self.dtype)
+        res = np.zeros((self.shape[0],) + pop.shape[1:])
+
+        bounds = self._bounds()
+        for k, rows in enumerate(bounds):
+            for cols in bounds[k:]:
+                (upper, lower) = self.tiles(rows, cols)
+                res[rows[0]:rows[1]] += np.dot(upper, cast[cols[0]:cols[1]])
+                if cols != rows:
+                    res[cols[0]:cols[1]] += np.dot(lower, cast[rows[0]:rows[1]])
+
+        return res
+
+    def submatrix(self, rows, cols):
+        return exact.payoff_block(self.types[rows], self.types[cols], self.data)
@@ -0,0 +1,52 @@
+import multiprocessing
+
+import numpy as np
+
+
+def member_seeds(seed, count):
+    """Independent seed sequences for count batch members, spawned from seed."""
+
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+def generator(data):
+    """The random generator a simulation should draw from.
+
+    Batch members get a generator of their own from data['seed_sequence'];
+    anything else falls back to the global numpy.random state.
+    """
+
+    if data.get('seed_sequence') is not None:
+        return np.random.Generator(np.random.PCG64(data['seed_sequence']))
+
+    return np.random
+
+
+def _run_member(task):
+    simulation_class, data, outfile = task
+    return simulation_class(data, 1, outfile).run()
+
+
+def run_batch(simulation_class, data, count, workers=None, seed=None, output_template=None):
+    """Run count simulations of simulation_class over data, in a process pool.
+
+    Member i draws only from the i-th sequence spawned from seed, and results
+    are returned in member order, so a given seed produces the same results
+    for any number of workers.
+    """
+
+    tasks = []
+    for member, seed_sequence in enumerate(member_seeds(seed, count)):
+        member_data = dict(data, member=member, seed_sequence=seed_sequence)
+        outfile = output_template.format(member) if output_template is not None else None
+        tasks.append((simulation_class, member_data, outfile))
+
+    if workers == 1:
+        return [_run_member(task) for task in tasks]
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(_run_member, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
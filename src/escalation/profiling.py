@@ -0,0 +1,79 @@
+import contextlib
+import cProfile
+import timeit
+
+
+class PhaseTimer(object):
+    """Exclusive wall-clock time per named phase of a run.
+
+    Phases nest: while an inner phase runs, the outer one's clock is paused,
+    so the totals add up to at most the run's wall time and whatever is left
+    over belongs to nothing instrumented. Each phase costs two clock reads.
+    """
+
+    def __init__(self, clock=timeit.default_timer):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.totals = {}
+        self.counts = {}
+        self.contests = 0
+        self._stack = []
+        self._started = self.clock()
+
+    def elapsed(self):
+        return self.clock() - self._started
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        now = self.clock()
+        if self._stack:
+            outer = self._stack[-1]
+            self.totals[outer[0]] = self.totals.get(outer[0], 0.) + now - outer[1]
+
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = self.clock()
+            (_, since) = self._stack.pop()
+            self.totals[name] = self.totals.get(name, 0.) + now - since
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def count_contests(self, num):
+        self.contests += num
+
+    def report(self, generations):
+        """Lines describing where the run's time went and its throughput."""
+
+        wall = self.elapsed()
+        phases = sorted(self.totals.items(), key=lambda item: -item[1])
+        other = max(wall - sum(self.totals.values()), 0.)
+        parts = ["{0} {1:.4f}s ({2:.1f}%)".format(name, total, 100. * total / wall if wall else 0.) for name, total in phases + [('other', other)]]
+
+        # contests are only played inside these phases; without them there is no rate to give
+        contest_time = self.totals.get('contests', 0.) + self.totals.get('payoffs', 0.)
+        contest_rate = "{0:.0f}".format(self.contests / contest_time) if contest_time else "n/a"
+        return [
+            "phases: " + ", ".join(parts),
+            "throughput: {0} generations in {1:.4f}s ({2:.1f} generations/s), {3} contests ({4} contests/s)".format(
+                generations, wall, generations / wall if wall else 0., self.contests, contest_rate),
+        ]
+
+
+@contextlib.contextmanager
+def no_phase():
+    yield
+
+
+def profile_call(path, fn, *args, **kwdargs):
+    """fn(*args, **kwdargs) under cProfile, with the stats written to path for pstats or snakeviz."""
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwdargs)
+    finally:
+        profiler.dump_stats(path)
@@ -0,0 +1,78 @@
+import numpy as np
+
+from escalation import engine, exact, replicator, typegrid
+
+
+def _lookup(types, among):
+    # index in among of each of types, or -1
+    keys = dict((tuple(row), k) for k, row in enumerate(np.round(engine.type_array(among), 10).tolist()))
+    return np.array([keys.get(tuple(row), -1) for row in np.round(engine.type_array(types), 10).tolist()], dtype=np.int64)
+
+
+def refine(types, pop, payoffs, data, type_step, thresh_step, mass_tol=1e-3, seed_share=0.01):
+    """Refine a type grid around where pop has mass.
+
+    Types with share above mass_tol survive, joined by every valid type
+    within one (type_step, thresh_step) step of them. Survivors keep their
+    shares, scaled to 1 - seed_share; the rest of the new grid shares
+    seed_share equally, so the replicator dynamics can pick them up.
+    Payoffs between types already in the old grid are reused; only pairs
+    involving a new type are computed, both ways round from one walk.
+
+    Returns (types, population, payoff matrix) on the refined grid.
+    """
+
+    pop = np.asarray(pop, dtype=float)
+    survivors = typegrid.as_types(types)[pop > mass_tol]
+    new_types = typegrid.unique(np.concatenate([survivors, typegrid.neighbourhood(survivors, type_step, thresh_step)]))
+
+    old = _lookup(new_types, types)
+    known = np.flatnonzero(old >= 0)
+    fresh = np.flatnonzero(old < 0)
+
+    res = np.empty((new_types.shape[0], new_types.shape[0]))
+    res[np.ix_(known, known)] = np.asarray(payoffs)[np.ix_(old[known], old[known])]
+    if fresh.size:
+        (to_fresh, from_fresh) = exact.payoff_blocks(new_types[fresh], new_types, data)
+        res[fresh, :] = to_fresh
+        res[:, fresh] = from_fresh
+
+    new_pop = np.zeros(new_types.shape[0])
+    kept = _lookup(survivors, new_types)
+    new_pop[kept] = pop[pop > mass_tol]
+    new_pop *= (1. - seed_share) / new_pop.sum()
+    seeded = np.ones(new_types.shape[0], dtype=bool)
+    seeded[kept] = False
+    if seeded.any():
+        new_pop[seeded] = seed_share / seeded.sum()
+    else:
+        new_pop /= new_pop.sum()
+
+    return new_types, new_pop, res
+
+
+def evolve_refined(types, payoffs, data, type_step, thresh_step, levels, rule, pop, background_rate=0., mass_tol=1e-3, seed_share=0.01):
+    """Evolve pop on a coarse grid, then refine around the occupied types levels times.
+
+    types is the coarse grid, with spacings type_step and thresh_step, and
+    payoffs its payoff matrix. Each level runs until rule stops it, then
+    halves the spacing around the types with mass (see refine) and carries
+    the population over.
+
+    Returns (types, final population, [(number of types, generations,
+    reason) per level]).
+    """
+
+    history = []
+    for level in range(levels + 1):
+        step = lambda x: replicator.discrete_step(x, payoffs, background_rate)
+        (num, pop, reason) = replicator.evolve(pop, step, rule, payoffs if rule.residual_tol is not None else None)
+        history.append((len(types), num, reason))
+        if level == levels:
+            break
+
+        type_step /= 2.
+        thresh_step /= 2.
+        (types, pop, payoffs) = refine(types, pop, payoffs, data, type_step, thresh_step, mass_tol, seed_share)
+
+    return types, pop, history
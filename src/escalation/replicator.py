@@ -0,0 +1,154 @@
+import numpy as np
+
+# a step moving no share by more than this reaches a stable state, where the simulations framework's own loop stops too
+STABLE_TOL = 1e-10
+
+
+def discrete_step(pop, payoffs, background_rate=0.):
+    """One generation of the one-population discrete replicator dynamics.
+
+    x_i(t+1) = x_i(t) * (a + u(e^i, x(t))) / (a + u(x(t), x(t)))
+
+    pop may also be a matrix with one population per column, which turns the
+    fitness computation into a single matrix-matrix product.
+    """
+
+    return reproduce(pop, fitness_of(pop, payoffs, background_rate))
+
+
+def fitness_of(pop, payoffs, background_rate=0.):
+    """a + u(e^i, x) for every type i, the first half of discrete_step."""
+
+    return background_rate + payoffs.dot(pop)
+
+
+def reproduce(pop, fitness):
+    """The second half of discrete_step: shares reweighted by fitness and renormalised."""
+
+    return pop * fitness / (pop * fitness).sum(axis=0)
+
+
+def submatrix(payoffs, rows, cols):
+    if hasattr(payoffs, 'submatrix'):
+        return payoffs.submatrix(rows, cols)
+
+    return np.asarray(payoffs)[np.ix_(rows, cols)]
+
+
+class ActiveSetStepper(object):
+    """Discrete replicator steps evaluated only over the types that matter.
+
+    At each refresh the smallest shares are dropped, as many as possible while
+    their total stays at most tol; dropped types keep their share frozen until
+    the next refresh. Payoffs lie in [0, 1], so ignoring them changes any
+    active type's fitness by at most dropped_mass <= tol. A dropped type whose
+    full fitness beats the population mean could re-invade, so it is kept in
+    the active set. Refreshes happen every refresh_every steps, and sooner
+    if the dropped mass is above tol (as a restored active set may be), and
+    cost one full matrix-vector product. max_dropped_mass is the largest
+    dropped mass since the last reset.
+    """
+
+    def __init__(self, payoffs, background_rate=0., tol=1e-9, refresh_every=100):
+        self.payoffs = payoffs
+        self.background_rate = background_rate
+        self.tol = tol
+        self.refresh_every = refresh_every
+        self.reset()
+
+    def reset(self):
+        self.active = None
+        self.dropped_mass = 0.
+        self.max_dropped_mass = 0.
+        self._sub_payoffs = None
+        self._since_refresh = 0
+
+    def refresh(self, pop):
+        fitness = self.payoffs.dot(pop)
+        order = np.argsort(pop, kind='mergesort')
+        dropped = order[np.cumsum(pop[order]) <= self.tol]
+
+        active = np.ones(pop.shape[0], dtype=bool)
+        active[dropped] = False
+        active |= (pop > 0.) & (fitness > np.dot(pop, fitness))
+
+        self.active = np.flatnonzero(active)
+        self.dropped_mass = pop.sum() - pop[self.active].sum()
+        self.max_dropped_mass = max(self.max_dropped_mass, self.dropped_mass)
+        self._sub_payoffs = submatrix(self.payoffs, self.active, self.active)
+        self._since_refresh = 0
+
+    def restore(self, active, since_refresh, dropped_mass):
+        """Pick up from a saved active set, as if refresh had picked it since_refresh steps ago."""
+
+        self.active = np.asarray(active)
+        self.dropped_mass = dropped_mass
+        self.max_dropped_mass = max(self.max_dropped_mass, dropped_mass)
+        self._sub_payoffs = submatrix(self.payoffs, self.active, self.active)
+        self._since_refresh = since_refresh
+
+    def step(self, pop):
+        if self.active is None or self._since_refresh >= self.refresh_every or self.dropped_mass > self.tol:
+            self.refresh(pop)
+        self._since_refresh += 1
+
+        sub = pop[self.active]
+        fitness = self.background_rate + np.dot(self._sub_payoffs, sub)
+        res = pop.copy()
+        res[self.active] = sub * fitness * (sub.sum() / np.dot(sub, fitness))
+        return res
+
+
+def evolve(pop, step, rule, payoffs=None):
+    """Apply step to pop until rule says to stop, or a step leaves it within STABLE_TOL of where it was.
+
+    Returns (generations, final population, reason for stopping).
+    """
+
+    rule.reset()
+    num = 0
+    while True:
+        num += 1
+        (last, pop) = (pop, step(pop))
+        reason = rule.check(num, pop, payoffs)
+        if reason is None and np.abs(pop - last).max() <= STABLE_TOL:
+            reason = "stable state"
+        if reason is not None:
+            return num, pop, reason
+
+
+def evolve_many(pops, step, rule, payoffs=None):
+    """evolve for every column of pops at once.
+
+    Columns are dropped from the iteration as soon as rule stops them, so
+    finished runs cost nothing. Returns (generations, final populations,
+    reasons), with one entry or column per run.
+    """
+
+    rule.reset()
+    pops = np.array(pops, dtype=float)
+    live = np.arange(pops.shape[1])
+    generations = np.zeros(pops.shape[1], dtype=np.int64)
+    reasons = [None] * pops.shape[1]
+    num = 0
+
+    while live.size:
+        num += 1
+        current = step(pops[:, live])
+        stable = np.abs(current - pops[:, live]).max(axis=0) <= STABLE_TOL
+        pops[:, live] = current
+
+        going = np.ones(live.size, dtype=bool)
+        for i, reason in enumerate(rule.check_columns(num, current, payoffs)):
+            if reason is None and stable[i]:
+                reason = "stable state"
+            if reason is not None:
+                generations[live[i]] = num
+                reasons[live[i]] = reason
+                going[i] = False
+
+        if not going.all():
+            rule.keep_columns(going)
+            live = live[going]
+
+    return generations, pops, reasons
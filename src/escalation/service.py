@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import sys
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from escalation import sweep
+
+_evaluator = None
+
+
+def _init_worker(cache_dir, max_tables, max_bytes):
+    global _evaluator
+    _evaluator = sweep.Evaluator(cache_dir, max_tables, max_bytes)
+
+
+def _run_job(job):
+    index, options = job
+    try:
+        return index, {'result': _evaluator.run(options)}
+    except Exception as e:
+        return index, {'error': "{0}: {1}".format(type(e).__name__, e)}
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """One client connection: option sets in as JSON lines until EOF, results out as they finish.
+
+    Each result line is {"index", "options", "result"} or, for a job that
+    could not run, {"index", "options", "error"}, with index the job's line
+    number. Results come back in the order they finish.
+    """
+
+    def handle(self):
+        jobs = []
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+
+            index = len(jobs)
+            try:
+                (options,) = sweep.expand([json.loads(line.decode('utf-8'))])
+            except (ValueError, TypeError) as e:
+                self._send({'index': index, 'error': "{0}: {1}".format(type(e).__name__, e)})
+                jobs.append(None)
+                continue
+            jobs.append(options)
+
+        runnable = [(index, options) for index, options in enumerate(jobs) if options is not None]
+        for index, outcome in self.server.pool.imap_unordered(_run_job, runnable):
+            outcome.update(index=index, options=jobs[index])
+            self._send(outcome)
+
+    def _send(self, message):
+        self.wfile.write((json.dumps(message, sort_keys=True) + "\n").encode('utf-8'))
+        self.wfile.flush()
+
+
+class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server running sweep option sets in a pool of warm, pre-forked workers.
+
+    Jobs take the sweep options (sweep.DEFAULTS) only, not the other
+    SimulationBatch options. Every worker imports numpy and escalation once and keeps its own
+    sweep.Evaluator, so recently used outcome tables stay in memory between
+    jobs and clients; with cache_dir they are also shared on disk, in a cache
+    of at most max_bytes. Clients
+    are served concurrently and share the pool.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, workers=None, cache_dir=None, max_tables=8, max_bytes=None):
+        # only a stale socket left by an earlier server is replaced
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise OSError("{0} exists and is not a socket".format(path))
+            os.remove(path)
+
+        self.pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(cache_dir, max_tables, max_bytes))
+        socketserver.UnixStreamServer.__init__(self, path, JobHandler)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        self.pool.terminate()
+        self.pool.join()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def serve(path, workers=None, cache_dir=None, max_tables=8, max_bytes=None):
+    """Serve jobs on the Unix socket at path until interrupted or terminated."""
+
+    server = JobServer(path, workers, cache_dir, max_tables, max_bytes)
+    # installed after the pool forks, so that terminating the pool still kills its workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def submit(path, option_sets):
+    """Send option_sets to the server at path, yielding each result message as it arrives."""
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sock.sendall("".join(json.dumps(options) + "\n" for options in option_sets).encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+
+        reader = sock.makefile('rb')
+        for line in reader:
+            yield json.loads(line.decode('utf-8'))
+        reader.close()
+    finally:
+        sock.close()
@@ -1,11 +1,42 @@
-import numpy.random as rand
+import os
 
+import numpy as np
+
+from escalation import agents, cache, checkpoint, continuous, crn, engine, exact, fitness, parallel, profiling, refine, replicator, stationary, stopping, telemetry, trajectory, typegrid
 from simulations.dynamics.onepop_discrete_replicator import OnePopDiscreteReplicatorDynamics as OPDRD
 from simulations.simulation_runner import SimulationRunner as SimBatchBase
 
 
 class SimulationBatch(SimBatchBase):
 
+    def __init__(self, simulation_class, *args, **kwdargs):
+        self._simulation_class = simulation_class
+        super(SimulationBatch, self).__init__(simulation_class, *args, **kwdargs)
+
+    def go(self, option_args=None, option_values=None):
+        (options, args) = self.oparser.parse_args(args=option_args, values=option_values)
+        if options.workers is None and options.seed is None and options.initial_pops is None:
+            return super(SimulationBatch, self).go(option_args=option_args, option_values=option_values)
+
+        self.options = options
+        self.args = args
+        self.emit('options parsed', self)
+
+        if self.options.initial_pops is not None:
+            # basin mode: every initial population evolves in one simulation, side by side
+            results = self._simulation_class(self.data, 1, None).run_many(np.load(self.options.initial_pops))
+            for result in results:
+                self.emit('result', self, result)
+
+            return results
+
+        # reproducible batch mode: every member draws from its own spawned seed sequence
+        results = parallel.run_batch(self._simulation_class, self.data, self.options.runs, workers=self.options.workers, seed=self.options.seed, output_template=self.options.run_output)
+        for result in results:
+            self.emit('result', self, result)
+
+        return results
+
     def _add_listeners(self):
 
         super(SimulationBatch, self)._add_listeners()
@@ -18,6 +49,52 @@ class SimulationBatch(SimBatchBase):
             this.oparser.add_option("-l", "--cost-loss", action="store", type="float", dest="cost_loss", default=0.5, help="cost for a fight loser (default 0.5)")
             this.oparser.add_option("-k", "--update_modulus", action="store", type="float", dest="update_modulus", default=1., help="factor for how strong updates are after observation (default 1)")
             this.oparser.add_option("-p", "--update_correct", action="store", type="float", dest="update_correct", default=1., help="probability updates will be correct (default 1)")
+            this.oparser.add_option("--samples", action="store", type="int", dest="samples", default=None, help="estimate payoffs from this many contests per pair of types instead of computing them exactly")
+            this.oparser.add_option("--target-se", action="store", type="float", dest="target_se", default=None, help="with --samples, keep sampling each pair in batches until its payoff's standard error is below this")
+            this.oparser.add_option("--max-samples", action="store", type="int", dest="max_samples", default=None, help="most contests per pair with --target-se (default 100 times --samples)")
+            this.oparser.add_option("--crn-seed", action="store", type="int", dest="crn_seed", default=None, help="draw contest randomness from common random numbers with this seed, shared by runs at any costs or update parameters")
+            this.oparser.add_option("--tiled", action="store_true", dest="tiled", default=False, help="compute fitness tile by tile instead of storing the payoff matrix")
+            this.oparser.add_option("--tile-size", action="store", type="int", dest="tile_size", default=1024, help="number of types per side of a payoff tile (default 1024)")
+            this.oparser.add_option("--float32", action="store_true", dest="float32", default=False, help="keep payoff tiles in single precision")
+            this.oparser.add_option("--memory-budget", action="store", type="float", dest="memory_budget", default=0., help="megabytes of payoff tiles to keep between generations (default 0)")
+            this.oparser.add_option("--cache-dir", action="store", dest="cache_dir", default=None, help="directory in which to cache exact payoff matrices between runs")
+            this.oparser.add_option("--cache-size", action="store", type="float", dest="cache_size", default=1024., help="maximum size of the payoff cache in megabytes (default 1024)")
+            this.oparser.add_option("--workers", action="store", type="int", dest="workers", default=None, help="run a reproducible batch in a pool of this many processes")
+            this.oparser.add_option("--seed", action="store", type="int", dest="seed", default=None, help="seed for a reproducible batch")
+            this.oparser.add_option("--runs", action="store", type="int", dest="runs", default=1, help="number of simulations in a reproducible batch (default 1)")
+            this.oparser.add_option("--trajectory-dir", action="store", dest="trajectory_dir", default=None, help="write population trajectories to .npy files in this directory instead of printing generation numbers")
+            this.oparser.add_option("--report-every", action="store", type="int", dest="report_every", default=1, help="report every this many generations, or only on --report-change if 0 (default 1)")
+            this.oparser.add_option("--report-change", action="store", type="float", dest="report_change", default=None, help="also record a trajectory whenever any share moved by at least this much")
+            this.oparser.add_option("--max-generations", action="store", type="int", dest="max_generations", default=10000, help="maximum number of generations per run (default 10000)")
+            this.oparser.add_option("--change-tol", action="store", type="float", dest="change_tol", default=None, help="stop once the population moves by at most this much over the change window")
+            this.oparser.add_option("--change-norm", action="store", type="choice", choices=sorted(stopping.NORMS), dest="change_norm", default="l1", help="norm for --change-tol, l1 or linf (default l1)")
+            this.oparser.add_option("--change-window", action="store", type="int", dest="change_window", default=1, help="number of generations over which --change-tol is measured (default 1)")
+            this.oparser.add_option("--residual-tol", action="store", type="float", dest="residual_tol", default=None, help="stop once the stationary-point residual is at most this much")
+            this.oparser.add_option("--active-tol", action="store", type="float", dest="active_tol", default=None, help="only evaluate fitness for types outside the smallest shares totalling at most this much")
+            this.oparser.add_option("--active-refresh", action="store", type="int", dest="active_refresh", default=100, help="generations between active set refreshes (default 100)")
+            this.oparser.add_option("--initial-pops", action="store", dest="initial_pops", default=None, help=".npy file of initial populations, one per row, to evolve side by side")
+            this.oparser.add_option("--telemetry", action="store", type="choice", choices=["generation", "run"], dest="telemetry", default=None, help="report contest fight, run and observation-limit rates every generation or once per run")
+            this.oparser.add_option("--solve", action="store_true", dest="solve", default=False, help="find the rest point each run reaches directly instead of iterating generations")
+            this.oparser.add_option("--refine", action="store", type="int", dest="refine", default=None, help="after converging, halve the grid spacing around the occupied types and carry on, this many times")
+            this.oparser.add_option("--refine-mass", action="store", type="float", dest="refine_mass", default=1e-3, help="share above which a type's neighbourhood is refined (default 0.001)")
+            this.oparser.add_option("--refine-seed", action="store", type="float", dest="refine_seed", default=0.01, help="total share given to the types added by a refinement (default 0.01)")
+            this.oparser.add_option("--continuous", action="store", type="float", dest="continuous", default=None, help="integrate the continuous-time replicator dynamics for this long instead of iterating generations")
+            this.oparser.add_option("--ode-rtol", action="store", type="float", dest="ode_rtol", default=1e-6, help="relative error tolerance per step with --continuous (default 1e-6)")
+            this.oparser.add_option("--ode-atol", action="store", type="float", dest="ode_atol", default=1e-9, help="absolute error tolerance per step with --continuous (default 1e-9)")
+            this.oparser.add_option("--ode-report-every", action="store", type="float", dest="ode_report_every", default=1., help="with --continuous and --trajectory-dir, record the population every this much time (default 1)")
+            this.oparser.add_option("--ode-speed-tol", action="store", type="float", dest="ode_speed_tol", default=None, help="with --continuous, stop once the population moves at most this fast (l1 norm per unit time; keep it above the tolerances)")
+            this.oparser.add_option("--agents", action="store", type="int", dest="agents", default=None, help="evolve a finite population of this many agents instead of the replicator dynamics")
+            this.oparser.add_option("--update-rule", action="store", type="choice", choices=sorted(agents.RULES), dest="update_rule", default="moran", help="how agents change type: {0} (default moran)".format(", ".join(sorted(agents.RULES))))
+            this.oparser.add_option("--update-share", action="store", type="float", dest="update_share", default=0.01, help="share of agents updated each generation (default 0.01)")
+            this.oparser.add_option("--imitation-noise", action="store", type="float", dest="imitation_noise", default=0.1, help="payoff noise of the imitation rule (default 0.1)")
+            this.oparser.add_option("--shards", action="store", type="int", dest="shards", default=1, help="split the agents across this many processes (default 1)")
+            this.oparser.add_option("--shard-epoch", action="store", type="int", dest="shard_epoch", default=100, help="generations between mixing the shards' agents (default 100)")
+            this.oparser.add_option("--profile", action="store_true", dest="profile", default=False, help="time each phase of every run and report throughput at its end")
+            this.oparser.add_option("--profile-output", action="store", dest="profile_output", default=None, help="write a cProfile of each run to this file; {0} is replaced by the batch member and {1} by the run")
+            this.oparser.add_option("--checkpoint-dir", action="store", dest="checkpoint_dir", default=None, help="save run checkpoints in this directory")
+            this.oparser.add_option("--checkpoint-every", action="store", type="int", dest="checkpoint_every", default=1000, help="generations between checkpoints (default 1000)")
+            this.oparser.add_option("--resume", action="store_true", dest="resume", default=False, help="continue runs from their checkpoints in --checkpoint-dir")
+            this.oparser.add_option("--run-output", action="store", dest="run_output", default=None, help="output file template for reproducible batch members, formatted with the member number")
 
         def _check_options(this):
             if not this.options.num_types or this.options.num_types < 1:
@@ -26,8 +103,8 @@ class SimulationBatch(SimBatchBase):
             if not this.options.num_thresholds or this.options.num_thresholds < 1:
                 this.oparser.error("Number of thresholds must be at least 1")
 
-            if this.options.cost_obs < 0.:
-                this.oparser.error("Cost for observation must not be negative")
+            if this.options.cost_obs <= 0.:
+                this.oparser.error("Cost for observation must be positive")
 
             if this.options.cost_win < 0.:
                 this.oparser.error("Cost for winning must not be negative")
@@ -35,23 +112,189 @@ class SimulationBatch(SimBatchBase):
             if this.options.cost_loss < 0.:
                 this.oparser.error("Cost for losing must not be negative")
 
-            if this.options.update_modulus < 0.:
-                this.oparser.error("Update modulus must not be negative")
+            if this.options.update_modulus <= 0.:
+                this.oparser.error("Update modulus must be positive")
 
             if this.options.update_correct < 0. or this.options.update_correct > 1.:
                 this.oparser.error("Correct update probability must be between 0 and 1")
 
-        def _set_data(this):
-            this.data['type_step'] = type_step = 1. / float(this.options.num_types + 1)
-            this.data['thresh_step'] = thresh_step = 1. / float(this.options.num_thresholds + 1)
+            if this.options.samples is not None and this.options.samples < 1:
+                this.oparser.error("Number of samples must be at least 1")
+
+            if this.options.target_se is not None:
+                if this.options.samples is None:
+                    this.oparser.error("A target standard error needs --samples")
+                if this.options.target_se <= 0.:
+                    this.oparser.error("Target standard error must be positive")
+                if this.options.max_samples is not None and this.options.max_samples < this.options.samples:
+                    this.oparser.error("Maximum samples must be at least --samples")
+
+            if this.options.crn_seed is not None and this.options.crn_seed < 0:
+                this.oparser.error("Common random numbers seed must not be negative")
+
+            if this.options.tile_size < 1:
+                this.oparser.error("Tile size must be at least 1")
+
+            if this.options.memory_budget < 0.:
+                this.oparser.error("Memory budget must not be negative")
+
+            if this.options.tiled and this.options.samples is not None:
+                this.oparser.error("Tiled fitness needs exact payoffs")
+
+            if this.options.tiled and this.options.telemetry is not None:
+                this.oparser.error("Telemetry needs untiled payoffs")
+
+            if this.options.cache_size <= 0.:
+                this.oparser.error("Cache size must be positive")
+
+            if this.options.workers is not None and this.options.workers < 1:
+                this.oparser.error("Number of workers must be at least 1")
+
+            if this.options.seed is not None and this.options.seed < 0:
+                this.oparser.error("Seed must not be negative")
+
+            if this.options.runs < 1:
+                this.oparser.error("Number of runs must be at least 1")
+
+            if this.options.report_every < 0:
+                this.oparser.error("Report interval must not be negative")
+
+            if this.options.report_every == 0 and this.options.trajectory_dir is not None and this.options.report_change is None:
+                this.oparser.error("Recording only on change needs --report-change")
+
+            if this.options.report_change is not None and this.options.report_change <= 0.:
+                this.oparser.error("Report change must be positive")
+
+            if this.options.max_generations < 1:
+                this.oparser.error("Maximum number of generations must be at least 1")
+
+            if this.options.change_tol is not None and this.options.change_tol < 0.:
+                this.oparser.error("Change tolerance must not be negative")
+
+            if this.options.change_window < 1:
+                this.oparser.error("Change window must be at least 1")
+
+            if this.options.residual_tol is not None and this.options.residual_tol < 0.:
+                this.oparser.error("Residual tolerance must not be negative")
+
+            if this.options.active_tol is not None and this.options.active_tol < 0.:
+                this.oparser.error("Active set tolerance must not be negative")
+
+            if this.options.active_refresh < 1:
+                this.oparser.error("Active set refresh interval must be at least 1")
+
+            if this.options.refine is not None:
+                if this.options.refine < 1:
+                    this.oparser.error("Number of refinements must be at least 1")
+                if this.options.samples is not None or this.options.tiled:
+                    this.oparser.error("Grid refinement needs exact, untiled payoffs")
+                if this.options.refine_mass <= 0. or this.options.refine_mass >= 1.:
+                    this.oparser.error("Refinement mass must be between 0 and 1")
+                if this.options.refine_seed < 0. or this.options.refine_seed >= 1.:
+                    this.oparser.error("Refinement seed share must be at least 0 and less than 1")
+
+            if this.options.continuous is not None and this.options.continuous <= 0.:
+                this.oparser.error("Integration time must be positive")
 
-            this.data['types'] = tuple([(i * type_step, j * thresh_step, (j + k) * thresh_step) for i in range(1, this.options.num_types + 1) for j in range(1, this.options.num_thresholds + 1) for k in range(this.options.num_thresholds + 1 - j)])
+            if this.options.ode_rtol <= 0. or this.options.ode_atol <= 0.:
+                this.oparser.error("Integration tolerances must be positive")
+
+            if this.options.ode_report_every <= 0.:
+                this.oparser.error("Integration report interval must be positive")
+
+            if this.options.ode_speed_tol is not None and this.options.ode_speed_tol < 0.:
+                this.oparser.error("Speed tolerance must not be negative")
+
+            if this.options.agents is not None and this.options.agents < 2:
+                this.oparser.error("Number of agents must be at least 2")
+
+            if this.options.update_share <= 0. or this.options.update_share > 1.:
+                this.oparser.error("Update share must be positive and at most 1")
+
+            if this.options.imitation_noise <= 0.:
+                this.oparser.error("Imitation noise must be positive")
+
+            if this.options.shards < 1 or this.options.shard_epoch < 1:
+                this.oparser.error("Number of shards and shard epoch must be at least 1")
+
+            if this.options.agents is not None and this.options.residual_tol is not None:
+                this.oparser.error("Agent runs cannot stop on a stationary-point residual")
+
+            if this.options.agents is not None and this.options.shards > 1 and this.options.change_tol is not None:
+                this.oparser.error("Sharded agent runs cannot stop on a change tolerance")
+
+            if this.options.checkpoint_every < 1:
+                this.oparser.error("Checkpoint interval must be at least 1")
+
+            if this.options.resume and this.options.checkpoint_dir is None:
+                this.oparser.error("Resuming needs a checkpoint directory")
+
+            # runs only get distinct checkpoint files as numbered members of a reproducible batch
+            if this.options.checkpoint_dir is not None and (this.options.initial_pops is not None or (this.options.seed is None and this.options.workers is None)):
+                this.oparser.error("Checkpoints need a reproducible batch (--seed or --workers) without --initial-pops")
+
+        def _set_data(this):
+            (this.data['type_step'], this.data['thresh_step']) = typegrid.steps(this.options.num_types, this.options.num_thresholds)
+            this.data['types'] = typegrid.make_types(this.options.num_types, this.options.num_thresholds)
 
             this.data['cost_obs'] = this.options.cost_obs
             this.data['cost_win'] = this.options.cost_win
             this.data['cost_loss'] = this.options.cost_loss
             this.data['update_modulus'] = this.options.update_modulus
             this.data['update_correct'] = this.options.update_correct
+            this.data['samples'] = this.options.samples
+            this.data['target_se'] = this.options.target_se
+            this.data['max_samples'] = this.options.max_samples
+            this.data['crn_seed'] = this.options.crn_seed
+            this.data['tiled'] = this.options.tiled
+            this.data['tile_size'] = this.options.tile_size
+            this.data['payoff_dtype'] = 'float32' if this.options.float32 else 'float64'
+            this.data['memory_budget'] = int(this.options.memory_budget * 2 ** 20)
+            this.data['trajectory_dir'] = this.options.trajectory_dir
+            this.data['report_every'] = this.options.report_every
+            this.data['report_change'] = this.options.report_change
+            this.data['max_generations'] = this.options.max_generations
+            this.data['change_tol'] = this.options.change_tol
+            this.data['change_norm'] = this.options.change_norm
+            this.data['change_window'] = this.options.change_window
+            this.data['residual_tol'] = this.options.residual_tol
+            this.data['active_tol'] = this.options.active_tol
+            this.data['active_refresh'] = this.options.active_refresh
+            this.data['telemetry'] = this.options.telemetry
+            this.data['solve'] = this.options.solve
+            this.data['refine'] = this.options.refine
+            this.data['refine_mass'] = this.options.refine_mass
+            this.data['refine_seed'] = this.options.refine_seed
+            this.data['continuous'] = this.options.continuous
+            this.data['ode_rtol'] = this.options.ode_rtol
+            this.data['ode_atol'] = this.options.ode_atol
+            this.data['ode_speed_tol'] = this.options.ode_speed_tol
+            this.data['ode_report_every'] = this.options.ode_report_every
+            this.data['agents'] = this.options.agents
+            this.data['update_rule'] = this.options.update_rule
+            this.data['update_share'] = this.options.update_share
+            this.data['imitation_noise'] = this.options.imitation_noise
+            this.data['shards'] = this.options.shards
+            this.data['shard_epoch'] = this.options.shard_epoch
+            this.data['profile'] = this.options.profile
+            this.data['profile_output'] = this.options.profile_output
+            this.data['checkpoint_dir'] = this.options.checkpoint_dir
+            this.data['checkpoint_every'] = this.options.checkpoint_every
+            this.data['resume'] = this.options.resume
+
+            if this.options.cache_dir is not None and this.options.samples is None and not this.options.tiled:
+                payoff_cache = cache.PayoffCache(this.options.cache_dir, int(this.options.cache_size * 2 ** 20))
+                key = cache.cache_key(this.data)
+
+                # outcome tables don't depend on the costs, so runs that only vary them share one
+                this.data['table_limit'] = table_limit = 2 ** int(np.ceil(np.log2(exact.observation_limit(this.options.cost_obs))))
+                table_key = cache.cache_key(this.data, cache.TABLE_KEY_FIELDS)
+                # only the pairs i <= j are stored; the rest mirror them.  The table is only read on a cache miss
+                def table():
+                    return exact.unpack_outcome_table(payoff_cache.fetch(table_key, 'outcome_triangle', lambda: exact.packed_outcome_table(this.data['types'], this.data, table_limit)), len(this.data['types']))
+
+                payoff_cache.fetch(key, 'payoffs', lambda: exact.payoffs_from_outcomes(table(), this.options.cost_obs, this.options.cost_win, this.options.cost_loss))
+                this.data['payoffs_file'] = payoff_cache.path(key, 'payoffs')
 
         self.on('oparser set up', _set_options)
         self.on('options parsed', _check_options)
@@ -64,114 +307,389 @@ class Simulation(OPDRD):
 
         super(Simulation, self).__init__(*args, background_rate=1e-8, **kwdargs)
         self.types = self.data['types']
+        self.rand = parallel.generator(self.data)
+        self.crn = crn.CommonRandomNumbers(self.data['crn_seed']) if self.data.get('crn_seed') is not None else None
+        self.profiler = profiling.PhaseTimer() if self.data.get('profile') else None
+        self._profiled_runs = 0
+        self._payoffs = None
+        self.payoff_stderr = None
+        self.payoff_counts = None
+        self.refined_types = None
+        self._trajectory = None
+        self._runs = 0
+        self._generation_offset = 0
+        self._initial_pop = None
+        self._resume = None
+        self.stopping = stopping.StoppingRule(self.data.get('max_generations', 10000), self.data.get('change_tol'), self.data.get('change_norm', 'l1'), self.data.get('change_window', 1), self.data.get('residual_tol'))
+        self.stop_reason = None
+        self._stepper = None
+
+        self.telemetry = None
+        if self.data.get('telemetry') is not None and self.data.get('samples') is not None:
+            self.telemetry = telemetry.ContestTelemetry(len(self.types), exact.observation_limit(self.data['cost_obs']))
 
     def _add_listeners(self):
         super(Simulation, self)._add_listeners()
 
+        def initial_set_handler(this, initial_pop):
+            (resume, this._resume) = (this._resume, None)
+            this.stopping.reset()
+            this.stop_reason = None
+            this._generation_offset = 0
+            this._initial_pop = initial_pop
+            if this._stepper is not None:
+                this._stepper.reset()
+
+            if resume is not None:
+                this._restore_checkpoint(resume)
+
+            if this.data.get('trajectory_dir') is not None:
+                if resume is not None and 'trajectory_size' in resume:
+                    # outside a batch the file name is random, so the checkpoint remembers it
+                    mark = (int(resume['trajectory_size']), int(resume['trajectory_last_num']), resume['trajectory_last'])
+                    this._trajectory = trajectory.TrajectoryWriter.restore(str(resume['trajectory_path']), mark, this.data.get('report_every', 1), this.data.get('report_change'))
+                else:
+                    path = trajectory.trajectory_path(this.data['trajectory_dir'], this.data.get('member'), this._runs)
+                    this._trajectory = trajectory.TrajectoryWriter(path, this.data.get('report_every', 1), this.data.get('report_change'))
+                    this._trajectory.record(0, initial_pop)
+
+            this._runs += 1
+
         def generation_handler(this, num, thispop, lastpop):
-            print >> this.out, num
-            if num >= 1e4:
+            num += this._generation_offset
+
+            with this._phase('output'):
+                if this._trajectory is not None:
+                    this._trajectory.record(num, thispop)
+                elif this.data.get('report_every', 1) and num % this.data.get('report_every', 1) == 0:
+                    print(num, file=this.out)
+
+                if this.data.get('telemetry') == 'generation':
+                    print(this._contest_telemetry().report("generation {0}".format(num), thispop), file=this.out)
+
+            with this._phase('stopping'):
+                payoffs = this._payoff_matrix() if this.stopping.residual_tol is not None else None
+                this.stop_reason = this.stopping.check(num, thispop, payoffs)
+
+            if this.stop_reason is not None:
                 this.force_stop = True
+            elif this.data.get('checkpoint_dir') is not None and num % this.data.get('checkpoint_every', 1000) == 0:
+                with this._phase('checkpoint'):
+                    this._save_checkpoint(num, thispop)
 
-        self.on('generation', generation_handler)
+        def stable_state_handler(this, num, thispop, lastpop, firstpop):
+            num += this._generation_offset
 
-    def _interaction(self, my_place, profile):
-
-        strategy1 = self.types[profile[my_place]]
-        strategy2 = self.types[profile[my_place]]
-
-        cost_obs = self.data['cost_obs']
-        cost_win = self.data['cost_win']
-        cost_loss = self.data['cost_loss']
-        update_modulus = self.data['update_modulus']
-        update_correct = self.data['update_correct']
-
-        p1 = 0.5
-        p2 = 0.5
-
-        run = False
-        fight = False
-
-        obs_costs = 0.
-
-        def player1Wins():
-            return rand.uniform(0., 1.) <= (strategy1[0] / (strategy1[0] + strategy2[0]))
-
-        def isFight(prob):
-            return rand.uniform(0., 1.) <= prob
-
-        while not run and not fight:
-            if (obs_costs >= 1.):
-                res = (0., 0., False)[my_place]
-                self.emit('interaction', self, res, False)
-                return res
-
-            #check for running
-            if p1 < strategy1[1] and p2 < strategy2[1]:
-                run = True
-                res = (max(0.5 - obs_costs, 0.), max(0.5 - obs_costs, 0.), False)[my_place]
-                self.emit('interaction', self, res, False)
-                return res
-            elif p1 < strategy1[1]:
-                run = True
-                res = (max(0.5 - obs_costs, 0.), max(1. - obs_costs, 0.), False)[my_place]
-                self.emit('interaction', self, res, False)
-                return res
-            elif p2 < strategy2[1]:
-                run = True
-                res = (max(1. - obs_costs, 0.), max(0.5 - obs_costs, 0.), False)[my_place]
-                self.emit('interaction', self, res, False)
-                return res
-
-            #check for fighting
-            if p1 >= strategy1[2] and p2 >= strategy2[2]:
-                fight = True
-                if player1Wins():
-                    res = (max(1. - obs_costs - cost_win, 0.), max(0.5 - obs_costs - cost_loss, 0.), True)[my_place]
-                    self.emit('interaction', self, res, True)
-                    return res
-                else:
-                    res = (max(0.5 - obs_costs - cost_loss, 0.), max(1. - obs_costs - cost_win, 0.), True)[my_place]
-                    self.emit('interaction', self, res, True)
-                    return res
-            elif p1 >= strategy1[2]:
-                if isFight(p2):
-                    fight = True
-                    if player1Wins():
-                        res = (max(1. - obs_costs - cost_win, 0.), max(0.5 - obs_costs - cost_loss, 0.), True)[my_place]
-                        self.emit('interaction', self, res, True)
-                        return res
-                    else:
-                        res = (max(0.5 - obs_costs - cost_loss, 0.), max(1. - obs_costs - cost_win, 0.), True)[my_place]
-                        self.emit('interaction', self, res, True)
-                        return res
-                else:
-                    run = True
-                    res = (max(1. - obs_costs, 0.), max(0.5 - obs_costs, 0.), False)[my_place]
-                    self.emit('interaction', self, res, False)
-                    return res
-            elif p2 >= strategy2[2]:
-                if isFight(p1):
-                    fight = True
-                    if player1Wins():
-                        res = (max(1. - obs_costs - cost_win, 0.), max(0.5 - obs_costs - cost_loss, 0.), True)[my_place]
-                        self.emit('interaction', self, res, True)
-                        return res
-                    else:
-                        res = (max(0.5 - obs_costs - cost_loss, 0.), max(1. - obs_costs - cost_win, 0.), True)[my_place]
-                        self.emit('interaction', self, res, True)
-                        return res
-                else:
-                    run = True
-                    res = (max(0.5 - obs_costs, 0.), max(1. - obs_costs, 0.), False)[my_place]
-                    self.emit('interaction', self, res, True)
-                    return res
-
-            obs_costs += cost_obs
-            adjustment = (strategy1[0] - strategy2[0]) / (2. * update_modulus)
-            if rand.uniform(0., 1.) < update_correct:
-                p1 += adjustment
-                p2 -= adjustment
+            print("stopped after {0} generations: {1}".format(num, this.stop_reason or "stable state"), file=this.out)
+            if this.data.get('telemetry') is not None:
+                print(this._contest_telemetry().report("end of run", thispop), file=this.out)
+            if this._stepper is not None and this._stepper.active is not None:
+                print("active set: dropped mass at most {0:.3g} (tolerance {1:.3g})".format(this._stepper.max_dropped_mass, this._stepper.tol), file=this.out)
+
+            if this._trajectory is not None:
+                this._trajectory.record(num, thispop, force=True)
+                this._trajectory.close()
+                this._trajectory = None
+
+            if this.data.get('checkpoint_dir') is not None:
+                path = this._checkpoint_path(this._runs - 1)
+                if os.path.exists(path):
+                    os.remove(path)
+
+            this._report_profile(num)
+
+        self.on('initial set', initial_set_handler)
+        self.on('generation', generation_handler)
+        self.on('stable state', stable_state_handler)
+
+    def _payoff_matrix(self):
+        if self._payoffs is None and self.data.get('payoffs_file') is not None:
+            try:
+                self._payoffs = np.load(self.data['payoffs_file'], mmap_mode='r')
+            except (IOError, OSError):
+                pass
+
+        if self._payoffs is None:
+            with self._phase('payoffs'):
+                self._compute_payoffs()
+
+        return self._payoffs
+
+    def _compute_payoffs(self):
+        num_pairs = len(self.types) * (len(self.types) + 1) // 2
+
+        if self.data.get('tiled'):
+            self._payoffs = fitness.TiledFitness(self.types, self.data, self.data['tile_size'], self.data['payoff_dtype'], self.data['memory_budget'])
+        elif self.data.get('samples') is None:
+            self._payoffs = exact.payoff_matrix(self.types, self.data)
+        elif self.data.get('target_se') is None:
+            self._payoffs = engine.sample_payoffs(self.types, self.data, self.data['samples'], self.crn or self.rand, telemetry=self.telemetry)
+            self._count_contests(num_pairs * self.data['samples'])
+        else:
+            max_samples = self.data.get('max_samples') or 100 * self.data['samples']
+            (self._payoffs, self.payoff_stderr, self.payoff_counts) = engine.adaptive_payoffs(self.types, self.data, self.data['samples'], self.data['target_se'], max_samples, self.crn or self.rand, telemetry=self.telemetry)
+            self._count_contests(int(np.triu(self.payoff_counts).sum()))
+
+    def _phase(self, name):
+        if self.profiler is None:
+            return profiling.no_phase()
+
+        return self.profiler.phase(name)
+
+    def _count_contests(self, num):
+        if self.profiler is not None:
+            self.profiler.count_contests(num)
+
+    def _report_profile(self, generations):
+        if self.profiler is not None:
+            for line in self.profiler.report(generations):
+                print(line, file=self.out)
+
+    def emit(self, *args, **kwdargs):
+        with self._phase('events'):
+            return super(Simulation, self).emit(*args, **kwdargs)
+
+    def payoff_bounds(self, z=1.96):
+        # (low, high) bounds on each adaptively sampled payoff; other payoffs have none
+        self._payoff_matrix()
+        if self.payoff_stderr is None:
+            return None
+
+        return engine.confidence_bounds(np.asarray(self._payoffs), self.payoff_stderr, z)
+
+    def _contest_telemetry(self):
+        # sampled payoffs count their contests as they go; exact ones report expected outcomes
+        if self.telemetry is None:
+            table = exact.outcome_table(self.types, self.data, exact.observation_limit(self.data['cost_obs']))
+            self.telemetry = telemetry.ContestTelemetry.from_table(table)
+
+        return self.telemetry
+
+    def _checkpoint_path(self, run):
+        return checkpoint.checkpoint_path(self.data['checkpoint_dir'], self.data.get('member'), run)
+
+    def _save_checkpoint(self, num, pop):
+        arrays = {
+            'pop': pop,
+            'generation': num,
+            'initial_pop': self._initial_pop,
+            'rng_state': checkpoint.rng_state(self.rand),
+            'stop_history': self.stopping.history(),
+        }
+
+        # sampled payoffs and contest counts can't be recomputed identically, so they travel along
+        if self.data.get('samples') is not None:
+            arrays['payoffs'] = np.asarray(self._payoff_matrix())
+            if self.payoff_stderr is not None:
+                arrays['payoff_stderr'] = self.payoff_stderr
+                arrays['payoff_counts'] = self.payoff_counts
+            if self.telemetry is not None:
+                arrays['telemetry_kinds'] = self.telemetry.kinds
+                arrays['telemetry_rounds'] = self.telemetry.rounds
+
+        if self._stepper is not None and self._stepper.active is not None:
+            arrays['active'] = self._stepper.active
+            arrays['since_refresh'] = self._stepper._since_refresh
+            arrays['dropped_mass'] = self._stepper.dropped_mass
+
+        if self._trajectory is not None:
+            (arrays['trajectory_size'], arrays['trajectory_last_num'], arrays['trajectory_last']) = self._trajectory.mark()
+            arrays['trajectory_path'] = self._trajectory.path
+
+        checkpoint.save(self._checkpoint_path(self._runs - 1), **arrays)
+
+    def _restore_checkpoint(self, saved):
+        self._generation_offset = int(saved['generation'])
+        self._initial_pop = saved['initial_pop']
+        self.stopping.restore(saved['stop_history'])
+        checkpoint.set_rng_state(self.rand, str(saved['rng_state']))
+
+        if 'payoffs' in saved:
+            self._payoffs = saved['payoffs']
+        if 'payoff_stderr' in saved:
+            self.payoff_stderr = saved['payoff_stderr']
+            self.payoff_counts = saved['payoff_counts']
+        if 'telemetry_kinds' in saved and self.telemetry is not None:
+            self.telemetry.kinds[...] = saved['telemetry_kinds']
+            self.telemetry.rounds[...] = saved['telemetry_rounds']
+
+        if 'active' in saved:
+            self._active_set_stepper().restore(saved['active'], int(saved['since_refresh']), float(saved['dropped_mass']))
+
+    def run_many(self, initial_pops):
+        # plain replicator runs share one matrix-matrix product per generation; other modes go one by one
+        initial_pops = np.atleast_2d(np.asarray(initial_pops, dtype=float))
+        if initial_pops.shape[1] != len(self.types):
+            raise ValueError("initial populations have {0} shares, not one for each of {1} types".format(initial_pops.shape[1], len(self.types)))
+
+        payoffs = self._payoff_matrix()
+        if self.data.get('solve'):
+            return [self.solve(pop) for pop in initial_pops]
+        if self.data.get('agents'):
+            return [self.run_agents(pop) for pop in initial_pops]
+        if self.data.get('refine'):
+            return [self.run_refined(pop) for pop in initial_pops]
+        if self.data.get('continuous'):
+            return [self.run_continuous(pop) for pop in initial_pops]
+
+        residual_payoffs = payoffs if self.stopping.residual_tol is not None else None
+        if self.data.get('active_tol') is not None:
+            # every population has its own active set
+            stepper = self._active_set_stepper()
+            res = []
+            for pop in initial_pops:
+                stepper.reset()
+                (num, final_pop, reason) = replicator.evolve(pop, stepper.step, self.stopping, residual_payoffs)
+                res.append((num, pop, final_pop, reason))
+            return res
+
+        step = lambda pops: replicator.discrete_step(pops, payoffs, self.background_rate)
+        (generations, final_pops, reasons) = replicator.evolve_many(initial_pops.T, step, self.stopping, residual_payoffs)
+
+        return [(generations[k], initial_pops[k], final_pops[:, k], reasons[k]) for k in range(initial_pops.shape[0])]
+
+    def solve(self, initial_pop):
+        # replicator steps stand in for generations, and the rest point's stability for the stopping reason
+        if self.profiler is not None:
+            self.profiler.reset()
+
+        payoffs = self._payoff_matrix()
+        with self._phase('solve'):
+            (steps, pop, kind, radius) = stationary.solve(initial_pop, payoffs, self.background_rate, max_steps=self.data.get('max_generations', 10000))
+
+        print("{0} rest point after {1} steps (spectral radius {2:.6g}) on types {3}".format(kind, steps, radius, np.flatnonzero(pop > stationary.SUPPORT_TOL).tolist()), file=self.out)
+        self._report_profile(steps)
+        return (steps, initial_pop, pop, kind)
+
+    def run_refined(self, initial_pop):
+        # generations are summed over the levels; the last run's refined grid is kept in refined_types
+        if self.profiler is not None:
+            self.profiler.reset()
+
+        payoffs = np.asarray(self._payoff_matrix())
+        with self._phase('refine'):
+            (types, pop, history) = refine.evolve_refined(self.types, payoffs, self.data, self.data['type_step'], self.data['thresh_step'], self.data['refine'], self.stopping, initial_pop,
+                                                          self.background_rate, self.data.get('refine_mass', 1e-3), self.data.get('refine_seed', 0.01))
+
+        for level, (num_types, num, reason) in enumerate(history):
+            print("level {0}: {1} types, stopped after {2} generations: {3}".format(level, num_types, num, reason), file=self.out)
+
+        generations = sum(num for _, num, _ in history)
+        self.refined_types = types
+        self._report_profile(generations)
+        return (generations, initial_pop, pop, history[-1][2])
+
+    def run_continuous(self, initial_pop):
+        # integration steps stand in for generations in the result and the profile
+        if self.profiler is not None:
+            self.profiler.reset()
+
+        payoffs = self._payoff_matrix()
+        t_end = self.data['continuous']
+        times = np.arange(0., t_end, self.data.get('ode_report_every', 1.)) if self.data.get('trajectory_dir') is not None else ()
+
+        with self._phase('integrate'):
+            (steps, t, pop, reason, samples) = continuous.integrate(initial_pop, payoffs, t_end, times, self.data.get('ode_rtol', 1e-6), self.data.get('ode_atol', 1e-9), self.data.get('ode_speed_tol'),
+                                                                    max_steps=self.data.get('max_generations', 10000))
+
+        if self.data.get('trajectory_dir') is not None:
+            with self._phase('output'):
+                writer = trajectory.TrajectoryWriter(trajectory.trajectory_path(self.data['trajectory_dir'], self.data.get('member'), self._runs), interval=None)
+                for time, sample in zip(times, samples):
+                    writer.record(time, sample, force=True)
+                writer.record(t, pop, force=True)
+                writer.close()
+        self._runs += 1
+
+        print("integrated to time {0:.6g} in {1} steps: {2}".format(t, steps, reason), file=self.out)
+        self._report_profile(steps)
+        return (steps, initial_pop, pop, reason)
+
+    def _contests(self):
+        # sampled and tiled payoffs mean the grid is too big or too noisy for an exact outcome table
+        if self.data.get('samples') is not None or self.data.get('tiled'):
+            return agents.PlayedContests(self.types, self.data)
+
+        return agents.TableContests.from_types(self.types, self.data)
+
+    def run_agents(self, initial_pop):
+        if self.profiler is not None:
+            self.profiler.reset()
+
+        population = agents.initial_agents(initial_pop, self.data['agents'], self.rand)
+        options = {
+            'rule': self.data.get('update_rule', 'moran'),
+            'update_share': self.data.get('update_share', 0.01),
+            'background_rate': self.background_rate,
+            'noise': self.data.get('imitation_noise', 0.1),
+            'max_generations': self.data.get('max_generations', 10000),
+        }
+
+        with self._phase('payoffs'):
+            contests = self._contests()
+
+        with self._phase('contests'):
+            if self.data.get('shards', 1) > 1:
+                seed = self.data.get('seed_sequence')
+                if seed is None:
+                    seed = int(self.rand.uniform(0., 2. ** 32))
+                (num, shares, reason) = agents.evolve_sharded(population, contests, seed, self.data['shards'], self.data.get('shard_epoch', 100), **options)
             else:
-                p1 -= adjustment
-                p2 += adjustment
+                (num, shares, reason) = agents.evolve_agents(population, contests, self.rand, stopping_rule=self.stopping, **options)
+        self._count_contests(num * ((self.data['agents'] + 1) // 2))
+
+        print("agents stopped after {0} generations: {1}".format(num, reason), file=self.out)
+        self._report_profile(num)
+        return (num, initial_pop, shares, reason)
+
+    def _run(self):
+        if self.data.get('profile_output') is not None:
+            path = self.data['profile_output'].format(self.data.get('member', 0), self._profiled_runs)
+            self._profiled_runs += 1
+            return profiling.profile_call(path, self._run_mode)
+
+        return self._run_mode()
+
+    def _run_mode(self):
+        if self.data.get('solve'):
+            return self.solve(self._random_population())
+        if self.data.get('agents'):
+            return self.run_agents(self._random_population())
+        if self.data.get('refine'):
+            return self.run_refined(self._random_population())
+        if self.data.get('continuous'):
+            return self.run_continuous(self._random_population())
+
+        # reset here, not on 'initial set': handlers run inside the timer's events phase
+        if self.profiler is not None:
+            self.profiler.reset()
+
+        # a resumed run reports its whole length and the population it first started from
+        result = super(Simulation, self)._run()
+        return (result[0] + self._generation_offset, self._initial_pop) + tuple(result[2:])
+
+    def _random_population(self):
+        if self.data.get('resume') and self.data.get('checkpoint_dir') is not None:
+            self._resume = checkpoint.load(self._checkpoint_path(self._runs))
+            if self._resume is not None:
+                return self._resume['pop']
+
+        return self.rand.dirichlet([1.] * len(self.types))
+
+    def _active_set_stepper(self):
+        if self._stepper is None:
+            self._stepper = replicator.ActiveSetStepper(self._payoff_matrix(), self.background_rate, self.data['active_tol'], self.data.get('active_refresh', 100))
+
+        return self._stepper
+
+    def _step_generation(self, pop):
+        payoffs = self._payoff_matrix()
+
+        if self.data.get('active_tol') is not None:
+            with self._phase('step'):
+                return self._active_set_stepper().step(pop)
+
+        with self._phase('fitness'):
+            fitness = replicator.fitness_of(pop, payoffs, self.background_rate)
+        with self._phase('update'):
+            return replicator.reproduce(pop, fitness)
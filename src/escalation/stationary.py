@@ -0,0 +1,135 @@
+import numpy as np
+
+from escalation import replicator
+
+# shares at or below this count as extinct when reading off a rest point's support
+SUPPORT_TOL = 1e-6
+
+
+def rest_point(pop, payoffs, background_rate=0., tol=1e-12, max_steps=10000):
+    """Accelerated fixed-point iteration of the discrete replicator map.
+
+    Each cycle takes two replicator steps and extrapolates along them
+    (SQUAREM), then takes one more step from the extrapolated point. An
+    extrapolation that would push a surviving type's share to zero is
+    discarded for the plain second step, since extinct types never come
+    back and that could change which rest point is reached.
+
+    Returns (replicator steps taken, final population, l1 residual).
+    """
+
+    step = lambda x: replicator.discrete_step(x, payoffs, background_rate)
+    pop = np.asarray(pop, dtype=float)
+    steps = 0
+    residual = np.inf
+
+    while steps < max_steps:
+        pop1 = step(pop)
+        r = pop1 - pop
+        residual = np.abs(r).sum()
+        steps += 1
+        if residual < tol:
+            return steps, pop1, residual
+
+        pop2 = step(pop1)
+        v = pop2 - 2. * pop1 + pop
+        steps += 1
+        if not v.any():
+            pop = pop2
+            continue
+
+        alpha = min(-np.sqrt(r.dot(r) / v.dot(v)), -1.)
+        candidate = pop - 2. * alpha * r + alpha ** 2 * v
+        if np.all(candidate[pop > 0.] > 0.):
+            pop = step(np.maximum(candidate, 0.) / np.maximum(candidate, 0.).sum())
+            steps += 1
+        else:
+            pop = pop2
+
+    return steps, pop, residual
+
+
+def support_rest_point(pop, payoffs, support_tol=SUPPORT_TOL):
+    """The rest point with the same support as pop, solved for directly.
+
+    On its support a rest point gives every type the same payoff, a linear
+    system in the shares. Returns None when that system is singular or its
+    solution isn't a population.
+    """
+
+    support = np.flatnonzero(pop > support_tol)
+    sub = replicator.submatrix(payoffs, support, support)
+    size = support.size
+
+    system = np.zeros((size + 1, size + 1))
+    system[:size, :size] = sub
+    system[:size, size] = -1.
+    system[size, :size] = 1.
+    rhs = np.zeros(size + 1)
+    rhs[size] = 1.
+
+    try:
+        shares = np.linalg.solve(system, rhs)[:size]
+    except np.linalg.LinAlgError:
+        return None
+
+    if np.any(shares <= 0.):
+        return None
+
+    res = np.zeros(pop.shape[0])
+    res[support] = shares
+    return res
+
+
+def stability(pop, payoffs, background_rate=0., tol=1e-8, support_tol=1e-12):
+    """Classify a rest point of the discrete replicator map by its Jacobian.
+
+    The map keeps populations on the simplex, so the Jacobian's spectral
+    radius decides stability: the eigenvalues from within the support, and
+    f_i / (x . f) for each absent type, its invasion rate. Only the support
+    block of the payoffs is needed, so tiled payoffs work too.
+
+    Returns ('stable', 'neutral' or 'unstable', spectral radius).
+    """
+
+    pop = np.asarray(pop, dtype=float)
+    fitness = background_rate + np.asarray(payoffs.dot(pop))
+    mean = pop.dot(fitness)
+
+    support = pop > support_tol
+    inside = np.flatnonzero(support)
+    x = pop[inside]
+    f = fitness[inside]
+    sub = replicator.submatrix(payoffs, inside, inside)
+
+    jacobian = (np.diag(f) + x[:, np.newaxis] * sub) / mean - np.outer(x * f, f + x.dot(sub)) / mean ** 2
+    radius = np.abs(np.linalg.eigvals(jacobian)).max()
+    if not support.all():
+        radius = max(radius, fitness[~support].max() / mean)
+
+    if radius < 1. - tol:
+        return 'stable', radius
+    elif radius > 1. + tol:
+        return 'unstable', radius
+
+    return 'neutral', radius
+
+
+def solve(pop, payoffs, background_rate=0., tol=1e-12, max_steps=10000, support_tol=SUPPORT_TOL):
+    """Find the rest point pop reaches, without iterating generation by generation.
+
+    The accelerated iteration gets close; then, if the rest point with that
+    support is a population within support_tol of where it got, it is taken
+    as exact.
+
+    Returns (replicator steps taken, rest point, stability, spectral radius).
+    """
+
+    steps, pop, residual = rest_point(pop, payoffs, background_rate, tol, max_steps)
+
+    exact = support_rest_point(pop, payoffs, support_tol)
+    if exact is not None and np.abs(exact - pop).max() <= support_tol:
+        pop = exact
+
+    kind, radius = stability(pop, payoffs, background_rate, support_tol=support_tol)
+    return steps, pop, kind, radius
@@ -0,0 +1,145 @@
+import collections
+import functools
+import glob
+import multiprocessing
+import os
+
+import numpy as np
+
+from escalation import trajectory
+
+
+class Aggregate(object):
+    """One-pass statistics over the trajectory files of a batch.
+
+    Trajectories are read a chunk at a time and folded into running sums, so
+    memory depends on the number of types and recorded generations, never on
+    the number of runs. Aggregates over disjoint sets of files merge, which is
+    how files are processed in parallel.
+
+    A run counts as converged to a type when that type's final share is at
+    least converge_share.
+    """
+
+    def __init__(self, converge_share=0.99):
+        self.converge_share = converge_share
+        self.runs = 0
+        self.num_types = None
+        self.final_sum = None
+        self.final_sq_sum = None
+        self.generations_sum = 0
+        self.converged = collections.Counter()
+        # sorted recorded generations, with the population sums and run counts at each
+        self.gen_nums = np.empty(0)
+        self.gen_sums = None
+        self.gen_counts = np.zeros(0, dtype=np.int64)
+
+    def _check_types(self, num_types):
+        if self.num_types is None:
+            self.num_types = num_types
+            self.final_sum = np.zeros(num_types)
+            self.final_sq_sum = np.zeros(num_types)
+            self.gen_sums = np.zeros((0, num_types))
+        elif self.num_types != num_types:
+            raise ValueError("trajectories over {0} and {1} types cannot be aggregated together".format(self.num_types, num_types))
+
+    def _add_generations(self, nums, sums, counts):
+        # widen the tables to every generation seen, then add into them; nums may repeat
+        merged = np.union1d(self.gen_nums, nums)
+        if merged.size > self.gen_nums.size:
+            at = np.searchsorted(merged, self.gen_nums)
+            (gen_sums, gen_counts) = (np.zeros((merged.size, self.num_types)), np.zeros(merged.size, dtype=np.int64))
+            gen_sums[at] = self.gen_sums
+            gen_counts[at] = self.gen_counts
+            (self.gen_nums, self.gen_sums, self.gen_counts) = (merged, gen_sums, gen_counts)
+
+        at = np.searchsorted(self.gen_nums, nums)
+        np.add.at(self.gen_sums, at, sums)
+        np.add.at(self.gen_counts, at, counts)
+
+    def add_file(self, path):
+        last = None
+        for chunk in trajectory.iter_chunks(path):
+            if not chunk.shape[0]:
+                continue
+
+            self._check_types(chunk.shape[1] - 1)
+            self._add_generations(chunk[:, 0].astype(float), chunk[:, 1:].astype(float), 1)
+            last = chunk[-1]
+
+        if last is None:
+            return
+
+        final = last[1:].astype(float)
+        self.runs += 1
+        self.generations_sum += float(last[0])
+        self.final_sum += final
+        self.final_sq_sum += final * final
+        if final.max() >= self.converge_share:
+            self.converged[int(final.argmax())] += 1
+
+    def merge(self, other):
+        if other.num_types is None:
+            return self
+
+        self._check_types(other.num_types)
+        self.runs += other.runs
+        self.generations_sum += other.generations_sum
+        self.final_sum += other.final_sum
+        self.final_sq_sum += other.final_sq_sum
+        self.converged.update(other.converged)
+        self._add_generations(other.gen_nums, other.gen_sums, other.gen_counts)
+        return self
+
+    def mean_trajectory(self):
+        """(generations or times, mean population over the runs recorded at each of them)."""
+
+        if not self.gen_nums.size:
+            return self.gen_nums.copy(), np.empty((0, 0))
+
+        return self.gen_nums.copy(), self.gen_sums / self.gen_counts[:, np.newaxis]
+
+    def summary(self):
+        if not self.runs:
+            return {'runs': 0}
+
+        mean = self.final_sum / self.runs
+        return {
+            'runs': self.runs,
+            'mean_generations': self.generations_sum / float(self.runs),
+            'final_mean': mean.tolist(),
+            'final_std': np.sqrt(np.maximum(self.final_sq_sum / self.runs - mean * mean, 0.)).tolist(),
+            'converged': dict((str(k), v / float(self.runs)) for k, v in sorted(self.converged.items())),
+            'mixed': (self.runs - sum(self.converged.values())) / float(self.runs),
+        }
+
+
+def _aggregate_files(paths, converge_share):
+    res = Aggregate(converge_share)
+    for path in paths:
+        res.add_file(path)
+    return res
+
+
+def analyse(directory, pattern="trajectory_*.npy", workers=1, converge_share=0.99):
+    """Aggregate every trajectory file in directory matching pattern."""
+
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if workers == 1 or len(paths) < 2:
+        return _aggregate_files(paths, converge_share)
+
+    # a few groups per worker keeps the load balanced without shipping one aggregate per file
+    num_groups = min(len(paths), workers * 4)
+    groups = [paths[i::num_groups] for i in range(num_groups)]
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        parts = pool.map(functools.partial(_aggregate_files, converge_share=converge_share), groups, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    res = Aggregate(converge_share)
+    for part in parts:
+        res.merge(part)
+    return res
@@ -0,0 +1,80 @@
+import collections
+
+import numpy as np
+
+# norms of a population difference, or of each column of a matrix of them
+NORMS = {
+    'l1': lambda diff: np.abs(diff).sum(axis=0),
+    'linf': lambda diff: np.abs(diff).max(axis=0),
+}
+
+
+def stationary_residual(pop, payoffs):
+    """Max-norm of x_i * (u(e^i, x) - u(x, x)), which is zero exactly at rest points.
+
+    Works column by column when pop is a matrix of populations.
+    """
+
+    fitness = payoffs.dot(pop)
+    return np.abs(pop * (fitness - (pop * fitness).sum(axis=0))).max(axis=0)
+
+
+class StoppingRule(object):
+    """Decides when a replicator run has converged.
+
+    check returns the reason for stopping, or None to carry on:
+      'max generations' -- the generation cap was reached
+      'change'          -- the population moved by at most change_tol (in
+                           change_norm) over the last window generations
+      'stationary'      -- the stationary-point residual is at most residual_tol
+    """
+
+    def __init__(self, max_generations=10000, change_tol=None, change_norm='l1', window=1, residual_tol=None):
+        if change_norm not in NORMS:
+            raise ValueError("unknown norm {0!r}".format(change_norm))
+
+        self.max_generations = max_generations
+        self.change_tol = change_tol
+        self.change_norm = change_norm
+        self.window = window
+        self.residual_tol = residual_tol
+        self.reset()
+
+    def reset(self):
+        self._history = collections.deque(maxlen=self.window + 1)
+
+    def history(self):
+        return np.array(list(self._history))
+
+    def restore(self, history):
+        """Pick up from a history saved by history()."""
+
+        self.reset()
+        self._history.extend(np.asarray(history))
+
+    def check(self, num, pop, payoffs=None):
+        return self.check_columns(num, np.asarray(pop)[:, np.newaxis], payoffs)[0]
+
+    def check_columns(self, num, pops, payoffs=None):
+        """check for each column of a matrix of populations, returning a list of reasons."""
+
+        self._history.append(np.array(pops, copy=True))
+        res = [None] * pops.shape[1]
+
+        if self.max_generations is not None and num >= self.max_generations:
+            res = ['max generations'] * pops.shape[1]
+
+        if self.residual_tol is not None and payoffs is not None:
+            for i in np.flatnonzero(stationary_residual(pops, payoffs) <= self.residual_tol):
+                res[i] = 'stationary'
+
+        if self.change_tol is not None and len(self._history) > self.window:
+            for i in np.flatnonzero(NORMS[self.change_norm](self._history[-1] - self._history[0]) <= self.change_tol):
+                res[i] = 'change'
+
+        return res
+
+    def keep_columns(self, keep):
+        """Forget the history of columns that check_columns no longer sees."""
+
+        self._history = collections.deque([pops[:, keep] for pops in self._history], maxlen=self.window + 1)
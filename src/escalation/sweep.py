@@ -0,0 +1,253 @@
+import collections
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import sqlite3
+import time
+
+import numpy as np
+
+from escalation import cache, exact, replicator, stopping, typegrid
+
+# options for a sweep point, named and defaulting as the SimulationBatch options
+DEFAULTS = {
+    'num_types': 5,
+    'num_thresholds': 5,
+    'cost_obs': 0.1,
+    'cost_win': 0.2,
+    'cost_loss': 0.5,
+    'update_modulus': 1.,
+    'update_correct': 1.,
+    'runs': 1,
+    'seed': None,
+    'max_generations': 10000,
+    'change_tol': None,
+    'change_norm': 'l1',
+    'change_window': 1,
+    'residual_tol': None,
+}
+
+BACKGROUND_RATE = 1e-8
+
+
+def expand(spec):
+    """Option sets for a sweep spec, with defaults filled in.
+
+    A dict is a grid: every value that is a list is swept over, in sorted key
+    order. A list is taken as the option sets themselves.
+    """
+
+    if isinstance(spec, dict):
+        keys = sorted(spec)
+        values = [spec[key] if isinstance(spec[key], list) else [spec[key]] for key in keys]
+        spec = [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+    res = []
+    for options in spec:
+        unknown = sorted(set(options) - set(DEFAULTS))
+        if unknown:
+            raise ValueError("{0} (sweep points take only {1})".format("; ".join("unsupported option '{0}'".format(key) for key in unknown), ", ".join(sorted(DEFAULTS))))
+        res.append(dict(DEFAULTS, **options))
+
+    return res
+
+
+def point_key(options):
+    return hashlib.sha1(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SweepStore(object):
+    """SQLite work queue and result table for a sweep.
+
+    Points move from pending to running when a worker claims them, and to done
+    (with a row in results) or failed when it finishes. Claims take a write
+    lock, so any number of worker processes can share one file. Points are
+    keyed by their options, so adding a point twice is a no-op.
+    """
+
+    def __init__(self, path, timeout=60.):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS points (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                updated REAL
+            );
+            CREATE INDEX IF NOT EXISTS points_status ON points (status, id);
+            CREATE TABLE IF NOT EXISTS results (
+                point_id INTEGER PRIMARY KEY REFERENCES points (id),
+                result TEXT NOT NULL,
+                seconds REAL,
+                finished REAL
+            );
+        """)
+
+    def _transaction(self, statements):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            res = statements(self.conn)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return res
+
+    def add(self, option_sets):
+        rows = [(point_key(options), json.dumps(options, sort_keys=True), time.time()) for options in option_sets]
+        self._transaction(lambda conn: conn.executemany("INSERT OR IGNORE INTO points (key, options, updated) VALUES (?, ?, ?)", rows))
+
+    def claim(self):
+        def statements(conn):
+            row = conn.execute("SELECT id, options FROM points WHERE status = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("UPDATE points SET status = 'running', updated = ? WHERE id = ?", (time.time(), row[0]))
+            return row
+
+        row = self._transaction(statements)
+        if row is None:
+            return None
+
+        return row[0], json.loads(row[1])
+
+    def complete(self, point_id, result, seconds=None):
+        def statements(conn):
+            conn.execute("INSERT OR REPLACE INTO results (point_id, result, seconds, finished) VALUES (?, ?, ?, ?)", (point_id, json.dumps(result), seconds, time.time()))
+            conn.execute("UPDATE points SET status = 'done', error = NULL, updated = ? WHERE id = ?", (time.time(), point_id))
+
+        self._transaction(statements)
+
+    def fail(self, point_id, error):
+        self._transaction(lambda conn: conn.execute("UPDATE points SET status = 'failed', error = ?, updated = ? WHERE id = ?", (error, time.time(), point_id)))
+
+    def requeue(self, statuses=('running',)):
+        """Put points left in statuses (by an interrupted sweep, say) back in the queue."""
+
+        marks = ", ".join("?" * len(statuses))
+        self._transaction(lambda conn: conn.execute("UPDATE points SET status = 'pending' WHERE status IN ({0})".format(marks), tuple(statuses)))
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM points GROUP BY status").fetchall())
+
+    def results(self):
+        rows = self.conn.execute("SELECT p.options, r.result FROM points p JOIN results r ON r.point_id = p.id ORDER BY p.id")
+        for options, result in rows:
+            yield json.loads(options), json.loads(result)
+
+    def close(self):
+        self.conn.close()
+
+
+class Evaluator(object):
+    """Runs sweep points, keeping recently used outcome tables in memory.
+
+    Points that share a type grid and update parameters share an outcome
+    table, so only their first point pays for the contests; with a cache_dir
+    the tables are also shared through a PayoffCache of at most max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_tables=8, max_bytes=None):
+        self.payoff_cache = cache.PayoffCache(cache_dir, max_bytes) if cache_dir is not None else None
+        self.max_tables = max_tables
+        self._tables = collections.OrderedDict()
+
+    def _table(self, types, options):
+        limit = 2 ** int(np.ceil(np.log2(exact.observation_limit(options['cost_obs']))))
+        data = {'types': types, 'update_modulus': options['update_modulus'], 'update_correct': options['update_correct'], 'table_limit': limit}
+        key = cache.cache_key(data, cache.TABLE_KEY_FIELDS)
+
+        if key in self._tables:
+            table = self._tables.pop(key)
+        elif self.payoff_cache is not None:
+            table = exact.unpack_outcome_table(self.payoff_cache.fetch(key, 'outcome_triangle', lambda: exact.packed_outcome_table(types, data, limit)), len(types))
+        else:
+            table = exact.outcome_table(types, data, limit)
+
+        self._tables[key] = table
+        while len(self._tables) > self.max_tables:
+            self._tables.popitem(last=False)
+
+        return table
+
+    def payoffs(self, options):
+        types = typegrid.make_types(options['num_types'], options['num_thresholds'])
+        return exact.payoffs_from_outcomes(self._table(types, options), options['cost_obs'], options['cost_win'], options['cost_loss'])
+
+    def run(self, options):
+        payoffs = self.payoffs(options)
+        # without a seed, the point's own key makes its runs the same wherever and whenever it runs
+        seed = options['seed'] if options['seed'] is not None else int(point_key(options), 16)
+        gen = np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed)))
+        rule = stopping.StoppingRule(options['max_generations'], options['change_tol'], options['change_norm'], options['change_window'], options['residual_tol'])
+        step = lambda pop: replicator.discrete_step(pop, payoffs, BACKGROUND_RATE)
+
+        runs = []
+        for _ in range(options['runs']):
+            generations, pop, reason = replicator.evolve(gen.dirichlet([1.] * payoffs.shape[0]), step, rule, payoffs)
+            runs.append({'generations': generations, 'reason': reason, 'top': int(pop.argmax()), 'final': pop.tolist()})
+
+        return {'runs': runs}
+
+
+def work(path, cache_dir=None, max_bytes=None):
+    """Claim and run points from the sweep at path until none are pending."""
+
+    store = SweepStore(path)
+    evaluator = Evaluator(cache_dir, max_bytes=max_bytes)
+    done = 0
+
+    try:
+        while True:
+            claimed = store.claim()
+            if claimed is None:
+                return done
+
+            point_id, options = claimed
+            start = time.time()
+            try:
+                result = evaluator.run(options)
+            except Exception as e:
+                store.fail(point_id, repr(e))
+                continue
+
+            store.complete(point_id, result, time.time() - start)
+            done += 1
+    finally:
+        store.close()
+
+
+def run_sweep(path, option_sets=(), workers=1, cache_dir=None, retry_failed=False, max_bytes=None):
+    """Queue option_sets in the sweep at path and work through everything pending.
+
+    Points already done are skipped, and points left running by an
+    interrupted sweep are requeued. Returns the point counts by status.
+    """
+
+    store = SweepStore(path)
+    try:
+        store.add(option_sets)
+        store.requeue(('running', 'failed') if retry_failed else ('running',))
+    finally:
+        store.close()
+
+    if workers == 1:
+        work(path, cache_dir, max_bytes)
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            pool.map(functools.partial(work, cache_dir=cache_dir, max_bytes=max_bytes), [path] * workers, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    store = SweepStore(path)
+    try:
+        return store.counts()
+    finally:
+        store.close()
@@ -0,0 +1,64 @@
+import numpy as np
+
+from escalation import engine
+
+RUN_KINDS = (engine.BOTH_RUN, engine.ONE_RUNS, engine.TWO_RUNS)
+FIGHT_KINDS = (engine.ONE_WINS, engine.TWO_WINS)
+
+
+class ContestTelemetry(object):
+    """Contest outcomes per pair of types, kept in bulk arrays.
+
+    kinds[i, j, kind] and rounds[i, j, r] count contests of type i against
+    type j by outcome kind and by observation rounds paid for. Counts are
+    added a whole block of contests at a time by count_many, or taken as
+    exact probabilities from an outcome table by from_table. Nothing is
+    recorded unless a ContestTelemetry exists, so disabled telemetry costs a
+    single None check.
+    """
+
+    def __init__(self, num_types, limit):
+        self.kinds = np.zeros((num_types, num_types, engine.NUM_KINDS))
+        self.rounds = np.zeros((num_types, num_types, limit + 1))
+
+    @classmethod
+    def from_table(cls, table):
+        res = cls(table.shape[0], table.shape[-1] - 1)
+        res.kinds[...] = table.sum(axis=-1)
+        res.rounds[...] = table.sum(axis=-2)
+        return res
+
+    def count_many(self, types1, types2, kind, rounds):
+        pairs = np.asarray(types1) * self.kinds.shape[1] + np.asarray(types2)
+        self.kinds += np.bincount(pairs * engine.NUM_KINDS + kind, minlength=self.kinds.size).reshape(self.kinds.shape)
+        self.rounds += np.bincount(pairs * self.rounds.shape[-1] + rounds, minlength=self.rounds.size).reshape(self.rounds.shape)
+
+    def _weighted(self, counts, pop):
+        # population-weighted mix of each pair's normalised distribution, over the pairs seen
+        totals = counts.sum(axis=-1)
+        seen = totals > 0.
+        weights = np.outer(pop, pop) * seen
+        if not weights.sum():
+            return np.zeros(counts.shape[-1])
+
+        probs = counts / np.where(seen, totals, 1.)[..., np.newaxis]
+        return np.tensordot(weights, probs, axes=([0, 1], [0, 1])) / weights.sum()
+
+    def rates(self, pop):
+        """Fight, run and observation-limit rates, and mean rounds, for random matching in pop."""
+
+        kinds = self._weighted(self.kinds, pop)
+        hist = self._weighted(self.rounds, pop)
+        return {
+            'fight': kinds[list(FIGHT_KINDS)].sum(),
+            'run': kinds[list(RUN_KINDS)].sum(),
+            'limit': kinds[engine.LIMIT],
+            'mean_rounds': np.dot(hist, np.arange(hist.shape[0])),
+        }
+
+    def rounds_histogram(self, pop):
+        return self._weighted(self.rounds, pop)
+
+    def report(self, label, pop):
+        rates = self.rates(pop)
+        return "contests at {0}: fight {1:.4f} run {2:.4f} limit {3:.4f} mean rounds {4:.2f}".format(label, rates['fight'], rates['run'], rates['limit'], rates['mean_rounds'])
@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+import numpy as np
+
+
+def trajectory_path(directory, member=None, run=0):
+    """Path for a run's trajectory file, unique within directory."""
+
+    if member is not None:
+        return os.path.join(directory, "trajectory_{0}_{1}.npy".format(member, run))
+
+    handle, path = tempfile.mkstemp(prefix="trajectory_", suffix=".npy", dir=directory)
+    os.close(handle)
+    return path
+
+
+class TrajectoryWriter(object):
+    """Buffered writer of population vectors to a .npy file.
+
+    A generation is recorded every interval generations (never, if interval
+    is 0 or None), and also whenever the population has moved by at least
+    min_change (max-norm) since the last recorded one. Rows are (generation,
+    population...) and are appended to the file as one .npy array per full
+    buffer; read_trajectory stitches them back together. The file is started
+    afresh unless append is set.
+    """
+
+    def __init__(self, path, interval=1, min_change=None, buffer_rows=1024, dtype=np.float32, append=False):
+        self.path = path
+        self.interval = interval
+        self.min_change = min_change
+        self.buffer_rows = buffer_rows
+        self.dtype = dtype
+        self._rows = []
+        self._last = None
+        self._last_num = None
+        self._file = open(path, 'ab' if append else 'wb')
+
+    def _wanted(self, num, pop):
+        if self._last is None:
+            return True
+
+        if self.interval and num % self.interval == 0:
+            return True
+
+        return self.min_change is not None and np.abs(pop - self._last).max() >= self.min_change
+
+    def record(self, num, pop, force=False):
+        pop = np.asarray(pop)
+        if num == self._last_num or not (force or self._wanted(num, pop)):
+            return
+
+        row = np.empty(pop.shape[0] + 1, dtype=self.dtype)
+        row[0] = num
+        row[1:] = pop
+        self._rows.append(row)
+        self._last = pop.copy()
+        self._last_num = num
+
+        if len(self._rows) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            np.save(self._file, np.vstack(self._rows))
+            self._file.flush()
+            self._rows = []
+
+    def mark(self):
+        """Flush, and return what restore needs to carry on writing from this point."""
+
+        self.flush()
+        return self._file.tell(), self._last_num, self._last
+
+    @classmethod
+    def restore(cls, path, mark, *args, **kwdargs):
+        """Reopen path as it was at mark, dropping anything written after it."""
+
+        (size, last_num, last) = mark
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+
+        res = cls(path, *args, append=True, **kwdargs)
+        res._last_num = last_num
+        res._last = last
+        return res
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def iter_chunks(path):
+    with open(path, 'rb') as f:
+        end = os.fstat(f.fileno()).st_size
+        while f.tell() < end:
+            yield np.load(f)
+
+
+def read_trajectory(path):
+    """All recorded rows of a trajectory file, as (generations or times, populations)."""
+
+    chunks = list(iter_chunks(path))
+    if not chunks:
+        return np.empty(0), np.empty((0, 0))
+
+    rows = np.vstack(chunks)
+    return rows[:, 0].astype(float), rows[:, 1:]
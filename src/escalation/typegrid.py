@@ -0,0 +1,76 @@
+import numpy as np
+
+# one record per type, laid out contiguously so a grid can be saved, memory-mapped and shared as is
+TYPE_DTYPE = np.dtype([('strength', np.float64), ('run', np.float64), ('fight', np.float64)])
+
+
+def steps(num_types, num_thresholds):
+    return 1. / float(num_types + 1), 1. / float(num_thresholds + 1)
+
+
+def as_types(types):
+    """types as a TYPE_DTYPE array, from one or from a sequence of (strength, run threshold, fight threshold)."""
+
+    types = np.asarray(types)
+    if types.dtype == TYPE_DTYPE:
+        return types
+
+    flat = np.ascontiguousarray(types, dtype=np.float64).reshape(-1, 3)
+    return flat.view(TYPE_DTYPE).reshape(-1)
+
+
+def make_types(num_types, num_thresholds):
+    """Uniform grid of (strength, run threshold, fight threshold) types, fight threshold at least the run threshold."""
+
+    type_step, thresh_step = steps(num_types, num_thresholds)
+    return as_types([(i * type_step, j * thresh_step, (j + k) * thresh_step) for i in range(1, num_types + 1) for j in range(1, num_thresholds + 1) for k in range(num_thresholds + 1 - j)])
+
+
+def pair_arrays(types, update_modulus):
+    """Pair-indexed (win probability, belief step) arrays.
+
+    win_prob[i, j] is the chance type i wins a fight against type j, and
+    belief_step[i, j] how far a correct observation moves type i's belief
+    that it is the stronger, s_i/(s_i + s_j) and (s_i - s_j)/(2 update_modulus).
+    """
+
+    strength = as_types(types)['strength']
+    total = strength[:, np.newaxis] + strength[np.newaxis, :]
+    win_prob = strength[:, np.newaxis] / np.where(total > 0., total, 1.)
+    belief_step = (strength[:, np.newaxis] - strength[np.newaxis, :]) / (2. * update_modulus)
+    return win_prob, belief_step
+
+
+def save(path, types):
+    np.save(path, as_types(types))
+
+
+def load(path, mmap_mode='r'):
+    """A saved type grid, memory-mapped read-only by default so processes can share it without copies."""
+
+    return np.load(path, mmap_mode=mmap_mode)
+
+
+def neighbourhood(types, type_step, thresh_step):
+    """Every valid type within one step of any of types, in each coordinate, including types themselves.
+
+    Valid types have strength in (0, 1) and 0 < run threshold <= fight
+    threshold < 1, as on the uniform grid. Duplicates are removed.
+    """
+
+    flat = np.ascontiguousarray(as_types(types).view(np.float64).reshape(-1, 3))
+    moves = np.array([-1., 0., 1.])
+    offsets = np.array(np.meshgrid(moves * type_step, moves * thresh_step, moves * thresh_step, indexing='ij')).reshape(3, -1).T
+
+    res = (flat[:, np.newaxis, :] + offsets[np.newaxis, :, :]).reshape(-1, 3)
+    eps = 1e-12
+    valid = (res[:, 0] > eps) & (res[:, 0] < 1. - eps) & (res[:, 1] > eps) & (res[:, 1] <= res[:, 2] + eps) & (res[:, 2] < 1. - eps)
+    return unique(res[valid])
+
+
+def unique(types):
+    """types without duplicates (up to rounding error), in order of first appearance."""
+
+    flat = np.ascontiguousarray(as_types(types).view(np.float64).reshape(-1, 3))
+    _, first = np.unique(np.round(flat, 10), axis=0, return_index=True)
+    return as_types(flat[np.sort(first)])
@@ -0,0 +1,53 @@
+import numpy as np
+
+from escalation import agents, exact, stopping, typegrid
+
+from fixtures import DATA
+
+
+class TestAgents:
+
+    def test_table_contests_match_exact_payoffs(self):
+        types = typegrid.make_types(3, 3)
+        payoffs = exact.payoff_matrix(types, DATA)
+        contests = agents.TableContests.from_types(types, DATA)
+        gen = np.random.Generator(np.random.PCG64(3))
+
+        pairs = np.repeat(np.arange(18 * 18), 20000)
+        payoffs1, payoffs2 = contests.play(pairs // 18, pairs % 18, gen)
+        means = np.bincount(pairs, payoffs1).reshape(18, 18) / 20000.
+        assert np.abs(means - payoffs).max() < 0.02
+        means = np.bincount(pairs, payoffs2).reshape(18, 18) / 20000.
+        assert np.abs(means - payoffs.T).max() < 0.02
+
+    def test_evolve(self):
+        types = typegrid.make_types(2, 2)
+        contests = agents.TableContests.from_types(types, DATA)
+        for rule in sorted(agents.RULES):
+            gen = np.random.Generator(np.random.PCG64(5))
+            population = agents.initial_agents(np.ones(6), 1001, gen)
+            assert population.dtype == np.uint8 and population.shape == (1001,)
+
+            num, shares, reason = agents.evolve_agents(population, contests, gen, rule, 0.05, max_generations=50)
+            assert np.isclose(shares.sum(), 1.) and np.allclose(shares, agents.agent_shares(population, 6))
+            assert (num == 50 and reason == "max generations") or reason == "fixation"
+
+    def test_stopping_rule_starts_afresh(self):
+        contests = agents.TableContests.from_types(typegrid.make_types(2, 2), DATA)
+        gen = np.random.Generator(np.random.PCG64(2))
+        rule = stopping.StoppingRule(change_tol=0., window=5)
+        for max_generations in (20, 1):
+            population = agents.initial_agents(np.ones(6), 1001, gen)
+            agents.evolve_agents(population, contests, gen, stopping_rule=rule, max_generations=max_generations)
+
+        assert len(rule.history()) == 1
+
+    def test_sharded_independent_of_workers(self):
+        types = typegrid.make_types(2, 2)
+        contests = agents.TableContests.from_types(types, DATA)
+        results = []
+        for workers in (1, 2):
+            population = agents.initial_agents(np.ones(6), 2000, np.random.Generator(np.random.PCG64(1)))
+            results.append(agents.evolve_sharded(population, contests, 9, 3, epoch=5, workers=workers, max_generations=20))
+
+        assert results[0][0] == results[1][0] and np.array_equal(results[0][1], results[1][1])
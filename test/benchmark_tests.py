@@ -0,0 +1,26 @@
+from escalation import benchmark
+
+
+def case(**measures):
+    res = {'num_types': 3, 'num_thresholds': 3, 'cost_obs': 0.1, 'cost_win': 0.2, 'cost_loss': 0.5,
+           'contests_per_second': 1000., 'generations_per_second': 100., 'batch_seconds': 1.}
+    res.update(measures)
+    return res
+
+
+class TestBenchmark:
+
+    def test_compare_flags_regressions(self):
+        baseline = {'cases': [case()]}
+
+        assert benchmark.compare({'cases': [case(contests_per_second=900., batch_seconds=1.1)]}, baseline) == []
+
+        regressions = benchmark.compare({'cases': [case(generations_per_second=50., batch_seconds=2.)]}, baseline)
+        assert len(regressions) == 2, regressions
+        assert regressions[0].startswith('batch_seconds') and regressions[1].startswith('generations_per_second')
+
+    def test_quick_suite(self):
+        results = benchmark.run_suite(grids=[(2, 2)], costs=[(0.25, 0.2, 0.5)], contests=1000, generations=10, runs=1, repeat=1)
+
+        assert len(results['cases']) == 1
+        assert all(results['cases'][0][measure] > 0. for measure in benchmark.MEASURES)
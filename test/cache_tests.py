@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from escalation import cache
+
+import fixtures
+
+DATA = dict(fixtures.DATA, types=((0.25, 0.25, 0.5), (0.5, 0.25, 0.75)))
+
+
+class TestPayoffCache:
+
+    def test_key_depends_on_parameters(self):
+        other = dict(DATA, cost_win=0.3)
+
+        assert cache.cache_key(DATA) == cache.cache_key(dict(DATA))
+        assert cache.cache_key(DATA) != cache.cache_key(other)
+
+    def test_fetch_and_evict(self):
+        directory = tempfile.mkdtemp()
+        try:
+            payoff_cache = cache.PayoffCache(directory, max_bytes=2000)
+            calls = []
+
+            def compute():
+                calls.append(1)
+                return np.ones((10, 10))
+
+            first = payoff_cache.fetch('a', 'payoffs', compute)
+            second = payoff_cache.fetch('a', 'payoffs', compute)
+            assert len(calls) == 1, calls
+            assert isinstance(second, np.memmap) and (first == second).all()
+
+            os.utime(payoff_cache.path('a', 'payoffs'), (0, 0))
+            payoff_cache.store('b', 'payoffs', np.zeros((10, 10)))
+            payoff_cache.store('c', 'payoffs', np.zeros((10, 10)))
+
+            assert payoff_cache.load('a', 'payoffs') is None
+            assert payoff_cache.load('c', 'payoffs') is not None
+        finally:
+            shutil.rmtree(directory)
+
+    def test_fetch_survives_eviction(self):
+        directory = tempfile.mkdtemp()
+        try:
+            class EvictedCache(cache.PayoffCache):
+                def store(self, key, name, array):
+                    super(EvictedCache, self).store(key, name, array)
+                    os.remove(self.path(key, name))
+
+            res = EvictedCache(directory).fetch('a', 'payoffs', lambda: np.ones((3, 3)))
+            assert np.array_equal(res, np.ones((3, 3)))
+        finally:
+            shutil.rmtree(directory)
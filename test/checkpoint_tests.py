@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+
+import numpy as np
+
+from escalation import checkpoint, stopping, trajectory
+
+
+class TestCheckpoint:
+
+    def test_rng_state_roundtrip(self):
+        for rand in (np.random.Generator(np.random.PCG64(5)), np.random.RandomState(5), np.random):
+            rand.uniform(size=3)
+            state = checkpoint.rng_state(rand)
+            expected = rand.uniform(size=4)
+            checkpoint.set_rng_state(rand, state)
+            assert np.array_equal(rand.uniform(size=4), expected)
+
+    def test_save_load_and_resume_writer(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = checkpoint.checkpoint_path(directory, 2, 1)
+            assert checkpoint.load(path) is None
+            assert path != checkpoint.checkpoint_path(directory, 3, 1)
+
+            rule = stopping.StoppingRule(change_tol=1e-3, window=3)
+            traj_path = trajectory.trajectory_path(directory, 2, 1)
+            writer = trajectory.TrajectoryWriter(traj_path, interval=5, buffer_rows=100)
+            for num in range(12):
+                pop = np.array([num / 20., 1. - num / 20.])
+                writer.record(num, pop)
+                rule.check(num, pop)
+            mark = writer.mark()
+            checkpoint.save(path, pop=pop, generation=11, stop_history=rule.history(),
+                            trajectory_size=mark[0], trajectory_last_num=mark[1], trajectory_last=mark[2])
+            # written after the checkpoint, and lost when the run dies
+            writer.record(15, np.array([0.9, 0.1]))
+            writer.flush()
+
+            saved = checkpoint.load(path)
+            assert int(saved['generation']) == 11 and np.array_equal(saved['pop'], pop)
+            resumed = stopping.StoppingRule(change_tol=1e-3, window=3)
+            resumed.restore(saved['stop_history'])
+            assert np.array_equal(resumed.history(), rule.history())
+
+            mark = (int(saved['trajectory_size']), int(saved['trajectory_last_num']), saved['trajectory_last'])
+            writer = trajectory.TrajectoryWriter.restore(traj_path, mark, interval=5)
+            writer.record(15, np.array([0.8, 0.2]))
+            writer.close()
+
+            nums, pops = trajectory.read_trajectory(traj_path)
+            assert list(nums) == [0, 5, 10, 15]
+            assert np.allclose(pops[-1], [0.8, 0.2])
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from escalation import continuous, exact, stationary, typegrid
+
+HAWK_DOVE = np.array([[0., 2.], [1., 1.]])
+
+
+def hawk_share(t, start):
+    # x' = x (1 - x) (1 - 2x) keeps x (1 - x) / (1 - 2x)^2 growing like e^t
+    growth = start * (1. - start) / (1. - 2. * start) ** 2 * np.exp(t)
+    return (1. - 1. / np.sqrt(1. + 4. * growth)) / 2.
+
+
+class TestContinuous:
+
+    def test_hawk_dove_dense_output(self):
+        times = np.array([0., 0.5, 1., 2.5, 5., 10.])
+        steps, t, pop, reason, samples = continuous.integrate(np.array([0.1, 0.9]), HAWK_DOVE, 20., times, rtol=1e-8, atol=1e-10)
+        assert t == 20. and reason == "time"
+        assert samples.shape == (6, 2)
+        assert np.abs(samples[:, 0] - hawk_share(times, 0.1)).max() < 1e-6
+        assert abs(pop[0] - hawk_share(20., 0.1)) < 1e-8
+
+    def test_dense_output_does_not_change_steps(self):
+        plain = continuous.integrate(np.array([0.1, 0.9]), HAWK_DOVE, 10.)
+        dense = continuous.integrate(np.array([0.1, 0.9]), HAWK_DOVE, 10., np.linspace(0., 10., 1001))
+        assert plain[0] == dense[0] and np.array_equal(plain[2], dense[2])
+
+    def test_stays_on_simplex(self):
+        data = {'cost_obs': 0.1, 'cost_win': 0.2, 'cost_loss': 0.5, 'update_modulus': 1., 'update_correct': 0.8}
+        payoffs = exact.payoff_matrix(typegrid.make_types(3, 3), data)
+        start = np.random.RandomState(3).dirichlet([1.] * payoffs.shape[0])
+
+        steps, t, pop, reason, samples = continuous.integrate(start, payoffs, 1e5, np.arange(0., 1e3, 10.), speed_tol=1e-8)
+        assert reason == "stationary" and t < 1e5
+        for x in np.vstack([samples, pop]):
+            assert x.min() >= 0. and abs(x.sum() - 1.) < 1e-12
+
+        _, rest, _, _ = stationary.solve(start, payoffs, 1e-8)
+        assert np.abs(pop - rest).max() < 1e-4
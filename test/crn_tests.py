@@ -0,0 +1,35 @@
+import numpy as np
+import numpy.random as rand
+
+from escalation import crn, engine, exact
+
+from fixtures import DATA, QUARTER_TYPES as TYPES
+
+
+class TestCommonRandomNumbers:
+
+    def test_draws_depend_only_on_counters(self):
+        numbers = crn.CommonRandomNumbers(7)
+        ids = crn.contest_ids([3, 3, 5], [0, 1, 0])
+        draws = numbers.contest_draws(ids, 2)
+
+        assert draws.shape == (crn.SLOTS, 3) and ((draws >= 0.) & (draws < 1.)).all()
+        assert np.array_equal(numbers.contest_draws(ids[::-1], 2), draws[:, ::-1])
+        assert not np.array_equal(crn.CommonRandomNumbers(8).contest_draws(ids, 2), draws)
+        assert abs(numbers.contest_draws(crn.contest_ids(0, np.arange(100000)), 0).mean() - 0.5) < 0.01
+
+    def test_independent_of_evaluation_order(self):
+        small = engine.sample_payoffs(TYPES, DATA, 500, crn.CommonRandomNumbers(1), block_size=1000)
+        large = engine.sample_payoffs(TYPES, DATA, 500, crn.CommonRandomNumbers(1))
+        assert np.array_equal(small, large)
+
+    def test_reduces_variance_of_differences(self):
+        other = dict(DATA, cost_win=0.25, update_correct=0.75)
+        expected = exact.payoff_matrix(TYPES, other) - exact.payoff_matrix(TYPES, DATA)
+
+        errors = []
+        for first, second in [(crn.CommonRandomNumbers(2), crn.CommonRandomNumbers(2)), (rand.RandomState(2), rand.RandomState(3))]:
+            difference = engine.sample_payoffs(TYPES, other, 2000, second) - engine.sample_payoffs(TYPES, DATA, 2000, first)
+            errors.append(np.abs(difference - expected).mean())
+
+        assert errors[0] < errors[1] / 2., errors
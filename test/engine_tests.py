@@ -0,0 +1,109 @@
+from fractions import Fraction
+
+import numpy as np
+import numpy.random as rand
+
+from escalation import engine, exact, typegrid
+
+from fixtures import DATA
+
+
+def scalar_contest(strategy1, strategy2, data, rand):
+    # one contest played out observation by observation, returning both payoffs
+    p1 = 0.5
+    p2 = 0.5
+    obs_costs = 0.
+    fight_payoffs = lambda: ((max(1. - obs_costs - data['cost_win'], 0.), max(0.5 - obs_costs - data['cost_loss'], 0.))
+                             if rand.uniform(0., 1.) <= strategy1[0] / (strategy1[0] + strategy2[0])
+                             else (max(0.5 - obs_costs - data['cost_loss'], 0.), max(1. - obs_costs - data['cost_win'], 0.)))
+
+    while True:
+        if obs_costs >= 1.:
+            return (0., 0.)
+
+        if engine.below(p1, strategy1[1]) and engine.below(p2, strategy2[1]):
+            return (max(0.5 - obs_costs, 0.), max(0.5 - obs_costs, 0.))
+        elif engine.below(p1, strategy1[1]):
+            return (max(0.5 - obs_costs, 0.), max(1. - obs_costs, 0.))
+        elif engine.below(p2, strategy2[1]):
+            return (max(1. - obs_costs, 0.), max(0.5 - obs_costs, 0.))
+
+        if not engine.below(p1, strategy1[2]) and not engine.below(p2, strategy2[2]):
+            return fight_payoffs()
+        elif not engine.below(p1, strategy1[2]):
+            return fight_payoffs() if rand.uniform(0., 1.) <= p2 else (max(1. - obs_costs, 0.), max(0.5 - obs_costs, 0.))
+        elif not engine.below(p2, strategy2[2]):
+            return fight_payoffs() if rand.uniform(0., 1.) <= p1 else (max(0.5 - obs_costs, 0.), max(1. - obs_costs, 0.))
+
+        obs_costs += data['cost_obs']
+        adjustment = (strategy1[0] - strategy2[0]) / (2. * data['update_modulus'])
+        if rand.uniform(0., 1.) < data['update_correct']:
+            p1 += adjustment
+            p2 -= adjustment
+        else:
+            p1 -= adjustment
+            p2 += adjustment
+
+
+class TestEngine:
+
+    def test_observation_costs(self):
+        costs = engine.observation_costs(0.25)
+        assert list(costs) == [0., 0.25, 0.5, 0.75, 1.], costs
+
+    def test_threshold_ties_on_sixths(self):
+        # on a grid of sixths beliefs land exactly on thresholds; added up either way they decide as exact fractions do
+        (type_step, thresh_step) = typegrid.steps(5, 5)
+        for i in range(1, 6):
+            for j in range(1, 6):
+                step = (i * type_step - j * type_step) / 2.
+                accumulated = 0.5
+                for net in range(11):
+                    belief = Fraction(1, 2) + net * Fraction(i - j, 12)
+                    for k in range(1, 6):
+                        expected = belief < Fraction(k, 6)
+                        assert engine.below(0.5 + net * step, k * thresh_step) == expected, (i, j, net, k)
+                        assert engine.below(accumulated, k * thresh_step) == expected, (i, j, net, k)
+                    accumulated += step
+
+    def test_immediate_outcomes(self):
+        strategy1 = [(0.5, 0.6, 0.9), (0.5, 0.6, 0.9), (0.5, 0.1, 0.2), (0.5, 0.1, 0.9)]
+        strategy2 = [(0.5, 0.6, 0.9), (0.5, 0.1, 0.9), (0.5, 0.1, 0.2), (0.5, 0.1, 0.9)]
+        kind, rounds = engine.play_contests(strategy1, strategy2, DATA)
+
+        assert list(kind[:2]) == [engine.BOTH_RUN, engine.ONE_RUNS], kind
+        assert kind[2] in (engine.ONE_WINS, engine.TWO_WINS), kind
+        assert kind[3] == engine.LIMIT, kind
+        assert list(rounds) == [0, 0, 0, len(engine.observation_costs(0.1)) - 1], rounds
+
+    def test_matches_scalar_distribution(self):
+        gen = rand.RandomState(1)
+        strategy1 = (0.75, 0.25, 0.5)
+        strategy2 = (0.25, 0.25, 0.5)
+        samples = 20000
+
+        kind, rounds = engine.play_contests([strategy1] * samples, [strategy2] * samples, DATA, gen)
+        vector = np.mean(engine.contest_payoffs(kind, rounds, DATA), axis=1)
+        scalar = np.mean([scalar_contest(strategy1, strategy2, DATA, gen) for _ in range(samples)], axis=0)
+
+        assert np.allclose(vector, scalar, atol=0.01), (vector, scalar)
+
+    def test_sample_payoffs_shape(self):
+        types = [(0.25, 0.25, 0.5), (0.5, 0.25, 0.75), (0.75, 0.5, 0.5)]
+        payoffs = engine.sample_payoffs(types, DATA, 50, rand.RandomState(2), block_size=64)
+
+        assert payoffs.shape == (3, 3), payoffs.shape
+        assert (payoffs >= 0.).all() and (payoffs <= 1.).all(), payoffs
+
+    def test_adaptive_payoffs(self):
+        types = [(0.2, 0.1, 0.9), (0.5, 0.3, 0.8), (0.9, 0.05, 0.4)]
+        gen = np.random.RandomState(11)
+        means, stderr, counts = engine.adaptive_payoffs(types, DATA, 200, 0.005, 50000, gen)
+        exact_means = exact.payoff_matrix(types, DATA)
+
+        assert counts.min() >= 200 and counts.max() <= 50000
+        assert np.all((stderr <= 0.005) | (counts == 50000))
+        low, high = engine.confidence_bounds(means, stderr, 4.)
+        assert np.all((low <= exact_means) & (exact_means <= high)), (means, exact_means)
+        # deterministic pairs are done after their first batch
+        assert counts[stderr == 0.].tolist() == [200] * int((stderr == 0.).sum())
@@ -0,0 +1,97 @@
+from fractions import Fraction
+
+import numpy as np
+import numpy.random as rand
+
+from escalation import engine, exact, typegrid
+
+from fixtures import DATA, QUARTER_TYPES as TYPES
+
+
+def rational_payoffs(strategy1, strategy2, data):
+    # the belief walk of one pair with beliefs and thresholds as fractions, so ties are decided exactly
+    step = (strategy1[0] - strategy2[0]) / (2 * Fraction(data['update_modulus']))
+    win_prob = float(strategy1[0] / (strategy1[0] + strategy2[0]))
+    payoffs = np.zeros(2)
+    mass = {0: 1.}
+
+    for cost in engine.observation_costs(data['cost_obs'])[:-1]:
+        going = {}
+        for net, weight in mass.items():
+            p1 = Fraction(1, 2) + net * step
+            p2 = 1 - p1
+            (run1, run2, fight1, fight2) = (p1 < strategy1[1], p2 < strategy2[1], p1 >= strategy1[2], p2 >= strategy2[2])
+
+            ends = np.zeros(engine.NUM_KINDS)
+            if run1 or run2:
+                ends[engine.BOTH_RUN if run1 and run2 else engine.ONE_RUNS if run1 else engine.TWO_RUNS] = 1.
+            elif fight1 or fight2:
+                fight = 1. if fight1 and fight2 else min(max(float(p2 if fight1 else p1), 0.), 1.)
+                ends[engine.TWO_RUNS if fight1 else engine.ONE_RUNS] = 1. - fight
+                ends[engine.ONE_WINS] = fight * win_prob
+                ends[engine.TWO_WINS] = fight * (1. - win_prob)
+            else:
+                going[net + 1] = going.get(net + 1, 0.) + weight * data['update_correct']
+                going[net - 1] = going.get(net - 1, 0.) + weight * (1. - data['update_correct'])
+                continue
+
+            payoff1, payoff2 = engine.outcome_payoffs(np.arange(engine.NUM_KINDS), cost, data['cost_win'], data['cost_loss'])
+            payoffs += weight * np.array([ends.dot(payoff1), ends.dot(payoff2)])
+        mass = going
+
+    return payoffs
+
+
+class TestExact:
+
+    def test_distribution_sums_to_one(self):
+        dist = exact.outcome_distribution(TYPES, TYPES[::-1], DATA)
+
+        assert dist.shape == (len(TYPES), engine.NUM_KINDS, len(engine.observation_costs(0.1))), dist.shape
+        assert np.allclose(dist.sum(axis=(1, 2)), 1.), dist.sum(axis=(1, 2))
+
+    def test_immediate_run(self):
+        payoff1, payoff2 = exact.expected_payoffs([(0.5, 0.6, 0.9)], [(0.5, 0.1, 0.9)], DATA)
+
+        assert np.allclose([payoff1[0], payoff2[0]], [0.5, 1.]), (payoff1, payoff2)
+
+    def test_matches_sampling(self):
+        payoffs = exact.payoff_matrix(TYPES, DATA, block_size=7)
+        sampled = engine.sample_payoffs(TYPES, DATA, 20000, rand.RandomState(0))
+
+        assert np.allclose(payoffs, sampled, atol=0.02), np.abs(payoffs - sampled).max()
+
+    def test_outcome_table_serves_any_costs(self):
+        table = exact.outcome_table(TYPES, DATA, 32)
+
+        for cost_obs, cost_win, cost_loss in [(0.1, 0.2, 0.5), (0.04, 0.3, 0.1), (0.3, 0., 0.)]:
+            data = dict(DATA, cost_obs=cost_obs, cost_win=cost_win, cost_loss=cost_loss)
+
+            assert np.allclose(exact.payoffs_from_outcomes(table, cost_obs, cost_win, cost_loss), exact.payoff_matrix(TYPES, data))
+            assert np.allclose(exact.outcomes_from_table(table, cost_obs), exact.outcome_matrix(TYPES, data))
+
+    def test_upper_triangle_matches_full_computation(self):
+        num_types = len(TYPES)
+        full = exact.payoff_block(TYPES, TYPES, DATA)
+        assert np.allclose(exact.payoff_matrix(TYPES, DATA), full, rtol=0., atol=1e-12)
+
+        rows = np.repeat(np.arange(num_types), num_types)
+        cols = np.tile(np.arange(num_types), num_types)
+        full_table = exact.outcome_distribution([TYPES[i] for i in rows], [TYPES[j] for j in cols], DATA, 16).reshape(num_types, num_types, engine.NUM_KINDS, 17)
+        packed = exact.packed_outcome_table(TYPES, DATA, 16)
+        assert packed.shape[0] == num_types * (num_types + 1) // 2
+        assert np.allclose(exact.unpack_outcome_table(packed, num_types), full_table, rtol=0., atol=1e-12)
+
+        sampled = engine.sample_payoffs(TYPES, DATA, 20000, rand.RandomState(4))
+        assert np.abs(sampled - full).max() < 0.02
+
+    def test_threshold_ties_match_exact_arithmetic(self):
+        # types on the grid of sixths whose contests reach beliefs exactly on a threshold
+        data = dict(DATA, update_correct=0.7)
+        subset = [3, 4, 8, 11, 18, 19, 23, 26, 33, 34, 38, 41]
+        grid = [(Fraction(i, 6), Fraction(j, 6), Fraction(j + k, 6)) for i in range(1, 6) for j in range(1, 6) for k in range(6 - j)]
+        payoffs = exact.payoff_block(typegrid.make_types(5, 5)[subset], typegrid.make_types(5, 5)[subset], data)
+
+        for a, i in enumerate(subset):
+            for b, j in enumerate(subset):
+                assert abs(payoffs[a, b] - rational_payoffs(grid[i], grid[j], data)[0]) < 1e-12, (i, j)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from escalation import exact, fitness
+
+from fixtures import DATA, SIXTH_TYPES as TYPES
+
+
+class TestTiledFitness:
+
+    def test_matches_dense_product(self):
+        payoffs = exact.payoff_matrix(TYPES, DATA)
+        pop = np.random.RandomState(0).dirichlet([1.] * len(TYPES))
+        tiled = fitness.TiledFitness(TYPES, DATA, tile_size=16, memory_budget=16 * 16 * 8 * 3)
+
+        assert np.allclose(tiled.dot(pop), payoffs.dot(pop))
+        assert np.allclose(tiled.dot(pop), payoffs.dot(pop))
+        assert len(tiled._tiles) == 3, len(tiled._tiles)
+
+    def test_single_precision(self):
+        payoffs = exact.payoff_matrix(TYPES, DATA)
+        pop = np.random.RandomState(1).dirichlet([1.] * len(TYPES))
+        tiled = fitness.TiledFitness(TYPES, DATA, tile_size=32, dtype=np.float32)
+
+        assert np.allclose(tiled.dot(pop), payoffs.dot(pop), atol=1e-6)
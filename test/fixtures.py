@@ -0,0 +1,13 @@
+# parameters and type grids shared by the test modules
+
+DATA = {
+    'cost_obs': 0.1,
+    'cost_win': 0.2,
+    'cost_loss': 0.5,
+    'update_modulus': 1.,
+    'update_correct': 0.8,
+}
+
+# thresholds on quarters, and on sixths, which aren't dyadic
+QUARTER_TYPES = [(i / 4., j / 4., (j + k) / 4.) for i in range(1, 4) for j in range(1, 4) for k in range(4 - j)]
+SIXTH_TYPES = [(i / 6., j / 6., (j + k) / 6.) for i in range(1, 6) for j in range(1, 6) for k in range(6 - j)]
@@ -0,0 +1,22 @@
+from escalation import parallel
+
+
+class DrawingSimulation(object):
+
+    def __init__(self, data, iterations, outfile):
+        self.data = data
+        self.rand = parallel.generator(data)
+
+    def run(self):
+        return (self.data['member'], tuple(self.rand.uniform(0., 1., size=3)))
+
+
+class TestParallel:
+
+    def test_same_results_for_any_worker_count(self):
+        serial = parallel.run_batch(DrawingSimulation, {}, 5, workers=1, seed=42)
+        pooled = parallel.run_batch(DrawingSimulation, {}, 5, workers=3, seed=42)
+
+        assert serial == pooled, (serial, pooled)
+        assert [member for member, _ in serial] == list(range(5))
+        assert len(set(draws for _, draws in serial)) == 5
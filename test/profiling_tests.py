@@ -0,0 +1,54 @@
+import os
+import pstats
+import shutil
+import tempfile
+
+from escalation import profiling
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+class TestProfiling:
+
+    def test_nested_phases_are_exclusive(self):
+        clock = FakeClock()
+        timer = profiling.PhaseTimer(clock)
+        with timer.phase('events'):
+            clock.now += 1.
+            with timer.phase('output'):
+                clock.now += 2.
+            clock.now += 0.5
+        with timer.phase('fitness'):
+            clock.now += 4.
+        clock.now += 2.5
+        timer.count_contests(100)
+
+        assert timer.totals == {'events': 1.5, 'output': 2., 'fitness': 4.}
+        assert timer.counts == {'events': 1, 'output': 1, 'fitness': 1}
+
+        phases, throughput = timer.report(20)
+        assert phases.startswith("phases: fitness 4.0000s (40.0%), output 2.0000s (20.0%)") and phases.endswith("other 2.5000s (25.0%)"), phases
+        assert "20 generations in 10.0000s (2.0 generations/s), 100 contests (n/a contests/s)" in throughput, throughput
+
+        with timer.phase('contests'):
+            clock.now += 4.
+        assert "100 contests (25 contests/s)" in timer.report(20)[1]
+
+        timer.reset()
+        assert timer.totals == {} and timer.contests == 0 and timer.elapsed() == 0.
+
+    def test_profile_call(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "run.prof")
+            assert profiling.profile_call(path, sorted, [3, 1, 2]) == [1, 2, 3]
+            assert pstats.Stats(path).total_calls > 0
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from escalation import exact, refine, stopping, typegrid
+
+from fixtures import DATA
+
+
+class TestRefine:
+
+    def test_neighbourhood(self):
+        types = typegrid.make_types(3, 3)
+        near = typegrid.neighbourhood(types[:1], 1. / 8., 1. / 8.)
+        flat = near.view(np.float64).reshape(-1, 3)
+
+        assert typegrid.unique(near).shape == near.shape
+        assert (flat[:, 1] <= flat[:, 2]).all() and (flat > 0.).all() and (flat < 1.).all()
+        assert tuple(types[0]) in [tuple(row) for row in near]
+
+    def test_refine_reuses_payoffs(self):
+        types = typegrid.make_types(3, 3)
+        payoffs = exact.payoff_matrix(types, DATA)
+        pop = np.random.RandomState(0).dirichlet([1.] * len(types))
+
+        new_types, new_pop, new_payoffs = refine.refine(types, pop, payoffs, DATA, 1. / 8., 1. / 8., 0.05, 0.02)
+        assert np.allclose(new_payoffs, exact.payoff_matrix(new_types, DATA), rtol=0., atol=1e-12)
+        assert np.isclose(new_pop.sum(), 1.)
+
+        survivors = [tuple(row) for row in types[pop > 0.05]]
+        shares = dict((tuple(row), share) for row, share in zip(new_types, new_pop))
+        assert np.allclose([shares[row] for row in survivors], pop[pop > 0.05] * 0.98 / pop[pop > 0.05].sum())
+
+    def test_evolve_refined(self):
+        types = typegrid.make_types(2, 2)
+        payoffs = exact.payoff_matrix(types, DATA)
+        rule = stopping.StoppingRule(500, change_tol=1e-9)
+        (type_step, thresh_step) = typegrid.steps(2, 2)
+        pop = np.ones(len(types)) / len(types)
+
+        new_types, new_pop, history = refine.evolve_refined(types, payoffs, DATA, type_step, thresh_step, 2, rule, pop, 1e-8)
+        assert len(history) == 3 and history[0][0] == len(types)
+        assert new_pop.shape == (len(new_types),) and np.isclose(new_pop.sum(), 1.)
+        assert history[-1][0] == len(new_types) and len(new_types) > len(types)
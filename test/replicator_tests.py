@@ -0,0 +1,52 @@
+import numpy as np
+
+from escalation import exact, replicator, stopping
+
+from fixtures import DATA, SIXTH_TYPES as TYPES
+
+PAYOFFS = exact.payoff_matrix(TYPES, DATA)
+POP = np.random.RandomState(0).dirichlet([1.] * len(TYPES))
+
+
+class TestReplicator:
+
+    def test_discrete_step_stays_on_simplex(self):
+        pop = replicator.discrete_step(POP, PAYOFFS, 1e-8)
+
+        assert np.allclose(pop.sum(), 1.) and (pop >= 0.).all()
+
+    def test_active_set_tracks_full_iteration(self):
+        stepper = replicator.ActiveSetStepper(PAYOFFS, 1e-8, tol=1e-6, refresh_every=50)
+        full = POP
+        active = POP
+        for _ in range(1000):
+            full = replicator.discrete_step(full, PAYOFFS, 1e-8)
+            active = stepper.step(active)
+
+        assert stepper.active.size < len(TYPES), stepper.active.size
+        assert stepper.dropped_mass <= stepper.max_dropped_mass <= 1e-6
+        assert np.abs(full - active).max() < 1e-5, np.abs(full - active).max()
+
+        # an active set dropping too much is replaced at the next step
+        stepper.restore(stepper.active[:1], 0, 0.5)
+        stepper.step(active)
+        assert stepper.dropped_mass <= 1e-6 and stepper.max_dropped_mass == 0.5
+
+    def test_evolve_stops_in_stable_state(self):
+        step = lambda pop: replicator.discrete_step(pop, PAYOFFS, 1e-8)
+        generations, pop, reason = replicator.evolve(POP, step, stopping.StoppingRule(max_generations=100000))
+
+        assert reason == "stable state" and generations < 100000
+        assert np.abs(step(pop) - pop).max() <= 2 * replicator.STABLE_TOL
+
+    def test_evolve_many_matches_single_runs(self):
+        pops = np.random.RandomState(3).dirichlet([1.] * len(TYPES), size=4).T
+        step = lambda pop: replicator.discrete_step(pop, PAYOFFS, 1e-8)
+        rule = stopping.StoppingRule(max_generations=5000, change_tol=1e-9, change_norm='linf')
+
+        generations, final, reasons = replicator.evolve_many(pops, step, rule)
+        for k in range(pops.shape[1]):
+            single = replicator.evolve(pops[:, k], step, rule)
+
+            assert single[0] == generations[k] and single[2] == reasons[k], (single[0], generations[k])
+            assert np.allclose(single[1], final[:, k])
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from escalation import service, sweep
+
+
+class TestService:
+
+    def test_jobs_stream_back(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "escalation.sock")
+        server = service.JobServer(path, workers=2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            jobs = [{'num_types': 2, 'num_thresholds': 2, 'cost_win': cost_win, 'seed': 0} for cost_win in (0.1, 0.2, 0.3)]
+            messages = list(service.submit(path, jobs + [{'no_such_option': 1}]))
+            # a second client reuses the same warm workers
+            again = list(service.submit(path, jobs[:1]))
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+            shutil.rmtree(directory)
+
+        assert sorted(message['index'] for message in messages) == [0, 1, 2, 3]
+        by_index = dict((message['index'], message) for message in messages)
+        assert "unsupported option 'no_such_option'" in by_index[3]['error']
+
+        evaluator = sweep.Evaluator()
+        for index, job in enumerate(jobs):
+            options = sweep.expand([job])[0]
+            assert by_index[index]['options'] == options
+            assert by_index[index]['result'] == evaluator.run(options)
+
+        assert again[0]['result'] == by_index[0]['result']
+        assert not os.path.exists(path)
+
+    def test_keeps_other_files(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "results.json")
+        with open(path, "w") as f:
+            f.write("{}")
+        try:
+            try:
+                service.JobServer(path, workers=1)
+                assert False, "replaced a regular file"
+            except OSError as e:
+                assert "not a socket" in str(e)
+            with open(path) as f:
+                assert f.read() == "{}"
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from escalation import exact, fitness
+from escalation.simulation import Simulation, SimulationBatch
+
+
+class Killed(Exception):
+    pass
+
+
+class KilledSimulation(Simulation):
+    # dies at generation 150, as if the process were killed
+
+    def _add_listeners(self):
+        super(KilledSimulation, self)._add_listeners()
+
+        def generation_handler(this, num, thispop, lastpop):
+            if num == 150:
+                raise Killed()
+
+        self.on('generation', generation_handler)
+
+
+def parsed_batch(args):
+    batch = SimulationBatch(Simulation)
+    (batch.options, batch.args) = batch.oparser.parse_args(args=args)
+    batch.emit('options parsed', batch)
+    return batch
+
+
+class TestSimulationOptions:
+
+    def test_tiled_options_reach_the_payoffs(self):
+        batch = parsed_batch(["-t", "3", "-y", "3", "--tiled", "--tile-size", "4", "--float32", "--memory-budget", "0.5"])
+        payoffs = Simulation(batch.data, 1, None)._payoff_matrix()
+
+        assert isinstance(payoffs, fitness.TiledFitness)
+        assert payoffs.tile_size == 4
+        assert payoffs.dtype == np.float32
+        assert payoffs.memory_budget == 2 ** 19
+
+    def test_tiled_telemetry_is_rejected(self):
+        try:
+            parsed_batch(["-t", "3", "-y", "3", "--tiled", "--telemetry", "run"])
+            assert False, "accepted --tiled with --telemetry"
+        except SystemExit:
+            pass
+
+    def test_warm_cache_skips_the_outcome_table(self):
+        directory = tempfile.mkdtemp()
+        unpack = exact.unpack_outcome_table
+        try:
+            args = ["-t", "3", "-y", "3", "--cache-dir", directory]
+            payoffs = np.load(parsed_batch(args).data['payoffs_file'])
+            assert sorted(name.split('.')[1] for name in os.listdir(directory)) == ['outcome_triangle', 'payoffs']
+
+            def fail(*args):
+                raise AssertionError("unpacked the outcome table on a warm cache")
+            exact.unpack_outcome_table = fail
+            assert np.array_equal(np.load(parsed_batch(args).data['payoffs_file']), payoffs)
+        finally:
+            exact.unpack_outcome_table = unpack
+            shutil.rmtree(directory)
+
+    def test_profiled_run(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "run.out")
+            batch = parsed_batch(["-t", "2", "-y", "2", "--profile", "--max-generations", "20"])
+            (generations, _, pop) = Simulation(batch.data, 1, path).run()[:3]
+
+            assert generations <= 20 and np.isclose(pop.sum(), 1.)
+            with open(path) as f:
+                output = f.read()
+            assert "phases: " in output and "throughput: {0} generations".format(generations) in output, output
+        finally:
+            shutil.rmtree(directory)
+
+    def test_resumed_run_matches_uninterrupted_one(self):
+        directory = tempfile.mkdtemp()
+        try:
+            args = ["-t", "3", "-y", "3", "--max-generations", "300", "--checkpoint-dir", directory, "--checkpoint-every", "100", "--seed", "4"]
+            data = dict(parsed_batch(args).data, member=0, seed_sequence=np.random.SeedSequence(4))
+            whole = Simulation(dict(data), 1, os.path.join(directory, "whole.out")).run()
+
+            try:
+                KilledSimulation(dict(data), 1, os.path.join(directory, "killed.out")).run()
+            except Killed:
+                pass
+            resumed = Simulation(dict(parsed_batch(args + ["--resume"]).data, member=0, seed_sequence=np.random.SeedSequence(4)), 1, os.path.join(directory, "resumed.out")).run()
+
+            assert resumed[0] == whole[0] == 300
+            assert np.array_equal(resumed[1], whole[1]) and np.array_equal(resumed[2], whole[2])
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from escalation import exact, replicator, stationary, stopping, typegrid
+
+HAWK_DOVE = np.array([[0., 2.], [1., 1.]])
+COORDINATION = np.array([[1., 0.], [0., 1.]])
+
+
+class TestStationary:
+
+    def test_hawk_dove(self):
+        steps, pop, kind, radius = stationary.solve(np.array([0.9, 0.1]), HAWK_DOVE, 0.1)
+        assert np.allclose(pop, [0.5, 0.5]) and kind == 'stable' and radius < 1.
+
+    def test_coordination(self):
+        steps, pop, kind, radius = stationary.solve(np.array([0.4, 0.6]), COORDINATION, 0.1)
+        assert np.allclose(pop, [0., 1.], atol=1e-6) and kind == 'stable'
+        assert stationary.stability(np.array([0.5, 0.5]), COORDINATION, 0.1)[0] == 'unstable'
+        assert stationary.support_rest_point(np.array([0.3, 0.7]), COORDINATION).tolist() == [0.5, 0.5]
+
+    def test_matches_iteration(self):
+        data = {'cost_obs': 0.1, 'cost_win': 0.2, 'cost_loss': 0.5, 'update_modulus': 1., 'update_correct': 0.8}
+        payoffs = exact.payoff_matrix(typegrid.make_types(3, 3), data)
+        start = np.random.RandomState(3).dirichlet([1.] * payoffs.shape[0])
+        rule = stopping.StoppingRule(20000, change_tol=1e-13)
+        _, iterated, _ = replicator.evolve(start, lambda pop: replicator.discrete_step(pop, payoffs, 1e-8), rule)
+
+        steps, pop, kind, radius = stationary.solve(start, payoffs, 1e-8)
+        assert steps < 1000
+        assert np.abs(pop - iterated).max() < 1e-4
+        assert np.abs(replicator.discrete_step(pop, payoffs, 1e-8) - pop).sum() < 1e-10
@@ -0,0 +1,38 @@
+import shutil
+import tempfile
+
+import numpy as np
+
+from escalation import stats, trajectory
+
+
+def write_run(directory, member, pops):
+    writer = trajectory.TrajectoryWriter(trajectory.trajectory_path(directory, member), buffer_rows=2, dtype=np.float64)
+    for num, pop in enumerate(pops):
+        writer.record(num, np.array(pop))
+    writer.close()
+
+
+class TestStats:
+
+    def test_aggregate(self):
+        directory = tempfile.mkdtemp()
+        try:
+            write_run(directory, 0, [(0.5, 0.5), (0.8, 0.2), (1., 0.)])
+            write_run(directory, 1, [(0.5, 0.5), (0.4, 0.6)])
+            write_run(directory, 2, [(0.5, 0.5), (0.2, 0.8), (0., 1.)])
+
+            serial = stats.analyse(directory)
+            pooled = stats.analyse(directory, workers=2)
+
+            for aggregate in (serial, pooled):
+                summary = aggregate.summary()
+                assert summary['runs'] == 3
+                assert summary['converged'] == {'0': 1 / 3., '1': 1 / 3.}, summary['converged']
+                assert np.allclose(summary['final_mean'], [1.4 / 3., 1.6 / 3.])
+
+                nums, pops = aggregate.mean_trajectory()
+                assert list(nums) == [0, 1, 2]
+                assert np.allclose(pops, [(0.5, 0.5), (1.4 / 3., 1.6 / 3.), (0.5, 0.5)])
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from escalation import stopping
+
+
+class TestStoppingRule:
+
+    def test_change_window(self):
+        rule = stopping.StoppingRule(change_tol=0.05, change_norm='linf', window=2)
+        pops = [np.array([0.5, 0.5]), np.array([0.54, 0.46]), np.array([0.58, 0.42]), np.array([0.6, 0.4]), np.array([0.61, 0.39])]
+        reasons = [rule.check(num, pop) for num, pop in enumerate(pops, 1)]
+
+        assert reasons == [None, None, None, None, 'change'], reasons
+
+    def test_stationary_and_cap(self):
+        payoffs = np.array([[1., 0.], [0., 1.]])
+        rule = stopping.StoppingRule(max_generations=3, residual_tol=1e-12)
+
+        assert rule.check(1, np.array([0.5, 0.5]), payoffs) == 'stationary'
+        assert rule.check(2, np.array([0.6, 0.4]), payoffs) is None
+        assert rule.check(3, np.array([0.7, 0.3]), payoffs) == 'max generations'
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+
+from escalation import sweep
+
+
+class TestSweep:
+
+    def test_expand_grid(self):
+        points = sweep.expand({'num_types': [2, 3], 'cost_win': [0.1, 0.2], 'runs': 2})
+
+        assert len(points) == 4
+        assert [(p['cost_win'], p['num_types']) for p in points] == [(0.1, 2), (0.1, 3), (0.2, 2), (0.2, 3)]
+        assert all(p['runs'] == 2 and p['cost_obs'] == 0.1 for p in points)
+
+    def test_unseeded_points_are_reproducible(self):
+        (point, other) = sweep.expand({'num_types': 2, 'num_thresholds': 2, 'cost_win': [0.1, 0.2]})
+        result = sweep.Evaluator().run(point)
+
+        assert result == sweep.Evaluator().run(point)
+        assert result['runs'][0]['final'] != sweep.Evaluator().run(other)['runs'][0]['final']
+
+    def test_resume_skips_done_points(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "sweep.db")
+            points = sweep.expand({'num_types': 2, 'num_thresholds': 2, 'cost_win': [0.1, 0.2, 0.3]})
+
+            store = sweep.SweepStore(path)
+            store.add(points)
+            claimed = store.claim()
+            store.close()
+
+            # the claimed point was left running, as if the sweep were killed
+            counts = sweep.run_sweep(path, points)
+            assert counts == {'done': 3}, counts
+
+            store = sweep.SweepStore(path)
+            results = list(store.results())
+            store.close()
+            assert [options for options, _ in results] == points
+            assert results[0][1]['runs'][0]['reason'] == 'stable state'
+            assert claimed[1] == points[0]
+        finally:
+            shutil.rmtree(directory)
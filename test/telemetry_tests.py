@@ -0,0 +1,33 @@
+import numpy as np
+import numpy.random as rand
+
+from escalation import engine, exact, telemetry
+
+from fixtures import DATA, QUARTER_TYPES as TYPES
+
+
+class TestTelemetry:
+
+    def test_sampled_counts_match_exact_rates(self):
+        limit = exact.observation_limit(DATA['cost_obs'])
+        counted = telemetry.ContestTelemetry(len(TYPES), limit)
+        engine.sample_payoffs(TYPES, DATA, 5000, rand.RandomState(0), telemetry=counted)
+        expected = telemetry.ContestTelemetry.from_table(exact.outcome_table(TYPES, DATA, limit))
+
+        assert counted.kinds.sum() == 5000 * len(TYPES) ** 2
+        assert (counted.rounds.sum(axis=-1) == 5000).all()
+
+        pop = np.ones(len(TYPES)) / len(TYPES)
+        sampled_rates = counted.rates(pop)
+        exact_rates = expected.rates(pop)
+        for key in ('fight', 'run', 'limit', 'mean_rounds'):
+            assert abs(sampled_rates[key] - exact_rates[key]) < 0.01, (key, sampled_rates[key], exact_rates[key])
+
+        assert np.isclose(sampled_rates['fight'] + sampled_rates['run'] + sampled_rates['limit'], 1.)
+
+    def test_unseen_pairs_are_ignored(self):
+        counted = telemetry.ContestTelemetry(2, 3)
+        counted.count_many(np.array([0]), np.array([0]), np.array([engine.ONE_WINS]), np.array([2]))
+
+        assert counted.rates(np.array([0.5, 0.5]))['fight'] == 1.
+        assert counted.rates(np.array([0., 1.]))['fight'] == 0.
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from escalation import trajectory
+
+
+class TestTrajectory:
+
+    def test_interval_and_chunks(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = trajectory.trajectory_path(directory, 3, 0)
+            writer = trajectory.TrajectoryWriter(path, interval=10, buffer_rows=2)
+            for num in range(35):
+                writer.record(num, np.array([num / 35., 1. - num / 35.]))
+            writer.record(34, np.array([34 / 35., 1. - 34 / 35.]), force=True)
+            writer.close()
+
+            nums, pops = trajectory.read_trajectory(path)
+            assert os.path.basename(path) == "trajectory_3_0.npy"
+            assert list(nums) == [0, 10, 20, 30, 34], nums
+            assert pops.shape == (5, 2) and np.allclose(pops.sum(axis=1), 1.)
+            assert len(list(trajectory.iter_chunks(path))) == 3
+        finally:
+            shutil.rmtree(directory)
+
+    def test_min_change(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = trajectory.trajectory_path(directory)
+            writer = trajectory.TrajectoryWriter(path, interval=None, min_change=0.1)
+            for num, share in enumerate([0., 0.05, 0.12, 0.15, 0.3]):
+                writer.record(num, np.array([share, 1. - share]))
+            writer.close()
+
+            nums, _ = trajectory.read_trajectory(path)
+            assert list(nums) == [0, 2, 4], nums
+        finally:
+            shutil.rmtree(directory)
+
+    def test_rewrites_existing_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = trajectory.trajectory_path(directory, 0, 0)
+            for _ in range(2):
+                writer = trajectory.TrajectoryWriter(path, interval=0, min_change=0.1)
+                for num, share in enumerate([0., 0.05, 0.12]):
+                    writer.record(num, np.array([share, 1. - share]))
+                writer.close()
+
+            nums, _ = trajectory.read_trajectory(path)
+            assert list(nums) == [0, 2], nums
+        finally:
+            shutil.rmtree(directory)
+
+    def test_fractional_times(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = trajectory.trajectory_path(directory, 0, 0)
+            writer = trajectory.TrajectoryWriter(path, interval=None)
+            for time in np.arange(0., 1., 0.25):
+                writer.record(time, np.array([time, 1. - time]), force=True)
+            writer.close()
+
+            times, _ = trajectory.read_trajectory(path)
+            assert list(times) == [0., 0.25, 0.5, 0.75], times
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from escalation import cache, engine, typegrid
+
+
+class TestTypegrid:
+
+    def test_structured_grid(self):
+        types = typegrid.make_types(3, 3)
+        assert types.dtype == typegrid.TYPE_DTYPE and types.shape == (18,)
+        assert np.all(types['fight'] >= types['run'])
+
+        flat = engine.type_array(types)
+        assert flat.shape == (18, 3) and np.shares_memory(flat, types)
+        assert np.array_equal(typegrid.as_types(flat.tolist()), types)
+        assert cache.cache_key({'types': types}, ()) == cache.cache_key({'types': flat.tolist()}, ())
+
+    def test_pair_arrays(self):
+        types = typegrid.make_types(2, 2)
+        win_prob, belief_step = typegrid.pair_arrays(types, 2.)
+        s = types['strength']
+        assert np.allclose(win_prob, s[:, np.newaxis] / (s[:, np.newaxis] + s))
+        assert np.allclose(belief_step, (s[:, np.newaxis] - s) / 4.)
+        assert np.allclose(win_prob + win_prob.T, 1.)
+
+    def test_save_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "types.npy")
+            typegrid.save(path, typegrid.make_types(2, 3))
+            types = typegrid.load(path)
+            assert isinstance(types, np.memmap) and np.array_equal(types, typegrid.make_types(2, 3))
+        finally:
+            shutil.rmtree(directory)